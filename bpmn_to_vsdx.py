@@ -9,15 +9,36 @@ Usage:
     python bpmn_to_vsdx.py --batch <folder>                 # All .bpmn in folder
     python bpmn_to_vsdx.py <input.bpmn> -o <output_dir>    # Custom output dir
 """
-import argparse
+import contextlib
 import math
 import os
 import re
 import sys
 import zipfile
-from io import BytesIO
+from functools import lru_cache
+from io import StringIO
+from itertools import chain, repeat
 from pathlib import Path
-from xml.etree import ElementTree as ET
+
+try:
+    # lxml (libxml2) parses large diagrams noticeably faster; it is optional and
+    # the stdlib parser below is a drop-in replacement for everything used here.
+    from lxml import etree as ET
+    _ITERPARSE_OPTIONS = {
+        'remove_blank_text': True,
+        'remove_comments': True,
+        'remove_pis': True,
+        'collect_ids': False,
+        'no_network': True,
+        # Expand internal DTD entities like the stdlib parser does, but never
+        # external ones: lxml < 5 treats any true value as "resolve all", so
+        # older versions get no entity expansion at all. huge_tree is left
+        # off, keeping libxml2's limits against entity amplification.
+        'resolve_entities': 'internal' if ET.LXML_VERSION >= (5,) else False,
+    }
+except ImportError:
+    from xml.etree import ElementTree as ET
+    _ITERPARSE_OPTIONS = {}
 
 
 # Element types we extract from BPMN
@@ -44,8 +65,21 @@ EVENT_START = {'startEvent'}
 EVENT_END = {'endEvent'}
 EVENT_INTERMEDIATE = {'intermediateCatchEvent', 'intermediateThrowEvent', 'boundaryEvent'}
 
+# BPMN element type -> shape category (unknown types render as tasks)
+_ELEMENT_CATEGORY = dict.fromkeys(TASK_TYPES, 'task')
+_ELEMENT_CATEGORY.update(dict.fromkeys(GATEWAY_TYPES, 'gateway'))
+_ELEMENT_CATEGORY.update(dict.fromkeys(EVENT_START, 'start_event'))
+_ELEMENT_CATEGORY.update(dict.fromkeys(EVENT_END, 'end_event'))
+_ELEMENT_CATEGORY.update(dict.fromkeys(EVENT_INTERMEDIATE, 'intermediate_event'))
+_ELEMENT_CATEGORY.update({
+    'participant': 'participant',
+    'lane': 'lane',
+    'textAnnotation': 'annotation',
+})
+
 # Pixels per inch for coordinate conversion
 PPI = 96.0
+INV_PPI = 1.0 / PPI  # multiply instead of divide in the per-shape/per-waypoint math
 
 # ── Connector Style Constants ────────────────────────────────────────────────
 CONNECTOR_COLOR = '#555555'         # Sequence flow line color
@@ -58,14 +92,66 @@ MSG_FLOW_LABEL_COLOR = '#555555'   # Label text color for message flows
 ARROW_LENGTH = 0.12                # Arrowhead length in inches
 ARROW_WIDTH_RATIO = 0.35           # Arrowhead half-width as ratio of length
 
+# ── Package Constants ────────────────────────────────────────────────────────
+VSDX_COMPRESSLEVEL = 1             # zlib level for large parts (1 is far cheaper than the default 6)
+VSDX_STORE_BELOW = 2048            # Parts smaller than this are stored uncompressed
+VSDX_PARTS_PER_WRITE = 256         # Shapes encoded and deflated per write when streaming page XML
+VSDX_WRITE_BUFFER = 1 << 20        # Output file buffer: the archive reaches disk in 1 MiB writes
+VSDX_DATE_TIME = (1980, 1, 1, 0, 0, 0)  # Fixed member timestamp: same input, byte-identical .vsdx
+
 
 # ── BPMN Parser ──────────────────────────────────────────────────────────────
 
+_LOCAL_TAGS = {}  # '{namespace}name' -> 'name'
+
+# Element ids are interned: the semantic id and the DI bpmnElement that refers to
+# it then share one str object, so the many id-keyed lookups in build_vsdx
+# resolve by identity instead of comparing characters.
+_intern = sys.intern
+
+
+def _local_tag(tag):
+    """Strip the namespace from a Clark-notation tag or attribute name.
+    A document only uses a handful of distinct names, so results are memoized."""
+    local = _LOCAL_TAGS.get(tag)
+    if local is None:
+        # lxml gives comments, PIs and entity references a factory function
+        # as their tag; map those to '' so no tag comparison matches them
+        local = tag.rpartition('}')[2] if isinstance(tag, str) else ''
+        _LOCAL_TAGS[tag] = local
+    return local
+
+
+# Clark-notation names of the DI children read from BPMNShape/BPMNEdge
+_TAG_BOUNDS = '{http://www.omg.org/spec/DD/20100524/DC}Bounds'
+_TAG_WAYPOINT = '{http://www.omg.org/spec/DD/20100524/DI}waypoint'
+_TAG_BPMN_LABEL = '{http://www.omg.org/spec/BPMN/20100524/DI}BPMNLabel'
+
+# Clark-notation names of the shape color attributes: bpmn.io's bioc:fill/stroke
+# and the OMG non-normative color:background-color/border-color (bioc wins)
+_ATTR_BIOC_FILL = '{http://bpmn.io/schema/bpmn/biocolor/1.0}fill'
+_ATTR_BIOC_STROKE = '{http://bpmn.io/schema/bpmn/biocolor/1.0}stroke'
+_ATTR_COLOR_BG = '{http://www.omg.org/spec/BPMN/non-normative/color/1.0}background-color'
+_ATTR_COLOR_BORDER = '{http://www.omg.org/spec/BPMN/non-normative/color/1.0}border-color'
+
+
+def _find_local(elem, name):
+    """Return the first child whose local tag is `name`, in any namespace.
+    Fallback for exporters that do not use the standard DI namespace URIs."""
+    for child in elem:
+        if _local_tag(child.tag) == name:
+            return child
+    return None
+
+
 def parse_bpmn(bpmn_path):
-    """Parse BPMN XML and extract elements, flows, and diagram coordinates."""
-    tree = ET.parse(bpmn_path)
-    root = tree.getroot()
+    """Parse BPMN XML and extract elements, flows, and diagram coordinates.
 
+    The document is streamed once with iterparse. Elements are registered on
+    their start tag (so dict order matches document order), while anything that
+    needs child nodes — annotation text, event definitions, DI bounds and
+    waypoints — is read on the end tag. Consumed subtrees are cleared as we go.
+    Each event is routed with a single dict lookup on the local tag name."""
     elements = {}   # id -> {type, name}
     flows = []      # [{id, sourceRef, targetRef, name}]
     shapes = {}     # bpmn_element_id -> {x, y, w, h}
@@ -74,78 +160,179 @@ def parse_bpmn(bpmn_path):
     # Track participant → process → lanes hierarchy
     participant_process = {}  # participant_id -> processRef
     process_lanes = {}        # processRef -> [lane_id, ...]
-
-    # Pass 1: Extract process elements and hierarchy
-    for elem in root.iter():
-        local_tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-
-        if local_tag in SHAPE_TYPES:
-            elem_id = elem.get('id')
-            elem_name = elem.get('name', '')
-            event_def = ''
-            if local_tag == 'textAnnotation' and not elem_name:
+    process_stack = []        # ids of the currently open <process> elements
+
+    # ── start-tag handlers (attributes only) ──
+
+    def start_shape(elem, local_tag):
+        elem_id = elem.get('id')
+        if elem_id:
+            # Name/event definition are completed on the end tag
+            elements[_intern(elem_id)] = {'type': local_tag, 'name': elem.get('name', '')}
+
+    def start_flow(elem, local_tag):
+        flow_id = elem.get('id')
+        source = elem.get('sourceRef')
+        target = elem.get('targetRef')
+        name = elem.get('name', '')
+        if flow_id and source and target:
+            flows.append({'id': _intern(flow_id), 'sourceRef': _intern(source),
+                          'targetRef': _intern(target), 'name': name, 'type': local_tag})
+
+    def start_participant(elem, local_tag):
+        elem_id = elem.get('id')
+        elem_name = elem.get('name', '')
+        process_ref = elem.get('processRef', '')
+        if elem_id:
+            elem_id = _intern(elem_id)
+            elements[elem_id] = {'type': local_tag, 'name': elem_name}
+            if process_ref:
+                participant_process[elem_id] = process_ref
+
+    def start_lane(elem, local_tag):
+        elem_id = elem.get('id')
+        elem_name = elem.get('name', '')
+        if elem_id:
+            elem_id = _intern(elem_id)
+            elements[elem_id] = {'type': local_tag, 'name': elem_name}
+            # Lanes (including nested child lanes) belong to the enclosing process
+            if process_stack:
+                process_lanes.setdefault(process_stack[-1], []).append(elem_id)
+
+    def start_process(elem, local_tag):
+        process_stack.append(elem.get('id', ''))
+
+    # ── end-tag handlers (children available) ──
+
+    def end_shape(elem, local_tag):
+        elem_data = elements.get(elem.get('id'))
+        if elem_data is not None:
+            if local_tag == 'textAnnotation' and not elem_data['name']:
                 # textAnnotation stores text in a child <text> element
                 for child in elem:
-                    child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
+                    child_tag = _local_tag(child.tag)
                     if child_tag == 'text' and child.text:
-                        elem_name = child.text
+                        elem_data['name'] = child.text
                         break
             # Capture event definition type for intermediate events
             if local_tag in ('intermediateCatchEvent', 'intermediateThrowEvent',
                              'startEvent', 'endEvent', 'boundaryEvent'):
                 for child in elem:
-                    child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
+                    child_tag = _local_tag(child.tag)
                     if child_tag.endswith('EventDefinition'):
-                        event_def = child_tag  # e.g., messageEventDefinition, timerEventDefinition
+                        elem_data['event_def'] = child_tag  # e.g., timerEventDefinition
                         break
-            if elem_id:
-                elem_data = {'type': local_tag, 'name': elem_name}
-                if event_def:
-                    elem_data['event_def'] = event_def
-                elements[elem_id] = elem_data
-
-        elif local_tag in ('sequenceFlow', 'messageFlow', 'association'):
-            flow_id = elem.get('id')
-            source = elem.get('sourceRef')
-            target = elem.get('targetRef')
-            name = elem.get('name', '')
-            if flow_id and source and target:
-                flows.append({'id': flow_id, 'sourceRef': source, 'targetRef': target,
-                              'name': name, 'type': local_tag})
-
-        elif local_tag == 'participant':
-            elem_id = elem.get('id')
-            elem_name = elem.get('name', '')
-            process_ref = elem.get('processRef', '')
-            if elem_id:
-                elements[elem_id] = {'type': local_tag, 'name': elem_name}
-                if process_ref:
-                    participant_process[elem_id] = process_ref
-
-        elif local_tag == 'lane':
-            elem_id = elem.get('id')
-            elem_name = elem.get('name', '')
-            if elem_id:
-                elements[elem_id] = {'type': local_tag, 'name': elem_name}
-
-        elif local_tag == 'laneSet':
-            # Find the parent process to map lanes to it
-            pass  # lanes are collected below
-
-    # Collect lanes per process by walking the tree structure
-    for elem in root.iter():
-        local_tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-        if local_tag == 'process':
-            proc_id = elem.get('id', '')
-            lanes = []
-            for child in elem.iter():
-                child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if child_tag == 'lane':
-                    lane_id = child.get('id')
-                    if lane_id:
-                        lanes.append(lane_id)
-            if lanes:
-                process_lanes[proc_id] = lanes
+        elem.clear()
+
+    def end_process(elem, local_tag):
+        process_stack.pop()
+
+    def end_bpmn_shape(elem, local_tag):
+        bpmn_element = elem.get('bpmnElement')
+        is_horiz_attr = elem.get('isHorizontal', '')
+        is_horizontal = is_horiz_attr.lower() == 'true' if is_horiz_attr else None
+        bounds = elem.find(_TAG_BOUNDS)
+        label = elem.find(_TAG_BPMN_LABEL)
+        if bounds is None:
+            bounds = _find_local(elem, 'Bounds')
+            label = _find_local(elem, 'BPMNLabel')
+        label_bounds = None
+        if label is not None:
+            # Look for dc:Bounds inside BPMNLabel
+            label_bounds = label.find(_TAG_BOUNDS)
+            if label_bounds is None:
+                label_bounds = _find_local(label, 'Bounds')
+        if bpmn_element and bounds is not None:
+            shape_data = {
+                'x': float(bounds.get('x', 0)),
+                'y': float(bounds.get('y', 0)),
+                'w': float(bounds.get('width', 100)),
+                'h': float(bounds.get('height', 80)),
+            }
+            if is_horizontal is not None:
+                shape_data['is_horizontal'] = is_horizontal
+            # Extract BPMNLabel position (absolute coords in BPMN space)
+            if label_bounds is not None:
+                shape_data['label_x'] = float(label_bounds.get('x', 0))
+                shape_data['label_y'] = float(label_bounds.get('y', 0))
+                shape_data['label_w'] = float(label_bounds.get('width', 80))
+                shape_data['label_h'] = float(label_bounds.get('height', 27))
+            # Extract BPMN color attributes (bioc:fill, bioc:stroke)
+            # These appear as namespaced attributes on BPMNShape elements
+            fill_color = elem.get(_ATTR_BIOC_FILL)
+            if fill_color is None:
+                fill_color = elem.get(_ATTR_COLOR_BG)
+            if fill_color is not None:
+                shape_data['fill_color'] = fill_color
+            stroke_color = elem.get(_ATTR_BIOC_STROKE)
+            if stroke_color is None:
+                stroke_color = elem.get(_ATTR_COLOR_BORDER)
+            if stroke_color is not None:
+                shape_data['stroke_color'] = stroke_color
+            shapes[_intern(bpmn_element)] = shape_data
+        elem.clear()
+
+    def end_bpmn_edge(elem, local_tag):
+        bpmn_element = elem.get('bpmnElement')
+        waypoint_elems = elem.findall(_TAG_WAYPOINT)
+        label = elem.find(_TAG_BPMN_LABEL)
+        if not waypoint_elems:
+            waypoint_elems = [child for child in elem if _local_tag(child.tag) == 'waypoint']
+            label = _find_local(elem, 'BPMNLabel')
+        waypoints = [{'x': float(wp.get('x', 0)), 'y': float(wp.get('y', 0))}
+                     for wp in waypoint_elems]
+        label_bounds = None
+        if label is not None:
+            lbl_bounds = label.find(_TAG_BOUNDS)
+            if lbl_bounds is None:
+                lbl_bounds = _find_local(label, 'Bounds')
+            if lbl_bounds is not None:
+                label_bounds = {
+                    'x': float(lbl_bounds.get('x', 0)),
+                    'y': float(lbl_bounds.get('y', 0)),
+                    'w': float(lbl_bounds.get('width', 40)),
+                    'h': float(lbl_bounds.get('height', 14)),
+                }
+        if bpmn_element and waypoints:
+            edge_data = edges[_intern(bpmn_element)] = {'waypoints': waypoints}
+            if label_bounds:
+                edge_data['label'] = label_bounds
+        elem.clear()
+
+    start_handlers = dict.fromkeys(SHAPE_TYPES, start_shape)
+    start_handlers.update({
+        'sequenceFlow': start_flow,
+        'messageFlow': start_flow,
+        'association': start_flow,
+        'participant': start_participant,
+        'lane': start_lane,
+        'process': start_process,
+    })
+    end_handlers = dict.fromkeys(SHAPE_TYPES, end_shape)
+    end_handlers.update({
+        'process': end_process,
+        'BPMNShape': end_bpmn_shape,
+        'BPMNEdge': end_bpmn_edge,
+    })
+
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(bpmn_path, events=('start', 'end'), **_ITERPARSE_OPTIONS):
+        local_tag = _local_tag(elem.tag)
+        if event == 'start':
+            depth += 1
+            if root is None:
+                root = elem
+            handler = start_handlers.get(local_tag)
+        else:
+            depth -= 1
+            handler = end_handlers.get(local_tag)
+        if handler is not None:
+            handler(elem, local_tag)
+        if depth == 1 and event == 'end':
+            # A top-level section (process, collaboration, diagram) is fully
+            # consumed — drop it so the tree never holds the whole document.
+            root.clear()
 
     # Build participant → lanes mapping
     participant_lanes = {}  # participant_id -> [lane_id, ...]
@@ -153,115 +340,41 @@ def parse_bpmn(bpmn_path):
         if proc_ref in process_lanes:
             participant_lanes[part_id] = process_lanes[proc_ref]
 
-    # Pass 2: Extract diagram coordinates
-    for elem in root.iter():
-        local_tag = elem.tag.split('}')[-1] if '}' in elem.tag else elem.tag
-
-        if local_tag == 'BPMNShape':
-            bpmn_element = elem.get('bpmnElement')
-            is_horiz_attr = elem.get('isHorizontal', '')
-            is_horizontal = is_horiz_attr.lower() == 'true' if is_horiz_attr else None
-            bounds = None
-            label_bounds = None
-            for child in elem:
-                child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if child_tag == 'Bounds':
-                    bounds = child
-                elif child_tag == 'BPMNLabel':
-                    # Look for dc:Bounds inside BPMNLabel
-                    for lbl_child in child:
-                        lbl_tag = lbl_child.tag.split('}')[-1] if '}' in lbl_child.tag else lbl_child.tag
-                        if lbl_tag == 'Bounds':
-                            label_bounds = lbl_child
-                            break
-            if bpmn_element and bounds is not None:
-                shape_data = {
-                    'x': float(bounds.get('x', 0)),
-                    'y': float(bounds.get('y', 0)),
-                    'w': float(bounds.get('width', 100)),
-                    'h': float(bounds.get('height', 80)),
-                }
-                if is_horizontal is not None:
-                    shape_data['is_horizontal'] = is_horizontal
-                # Extract BPMNLabel position (absolute coords in BPMN space)
-                if label_bounds is not None:
-                    shape_data['label_x'] = float(label_bounds.get('x', 0))
-                    shape_data['label_y'] = float(label_bounds.get('y', 0))
-                    shape_data['label_w'] = float(label_bounds.get('width', 80))
-                    shape_data['label_h'] = float(label_bounds.get('height', 27))
-                # Extract BPMN color attributes (bioc:fill, bioc:stroke)
-                # These appear as namespaced attributes on BPMNShape elements
-                for attr_name, attr_val in elem.attrib.items():
-                    local_attr = attr_name.split('}')[-1] if '}' in attr_name else attr_name
-                    if local_attr == 'fill' and 'bioc' in attr_name:
-                        shape_data['fill_color'] = attr_val
-                    elif local_attr == 'stroke' and 'bioc' in attr_name:
-                        shape_data['stroke_color'] = attr_val
-                    elif local_attr == 'background-color' and 'color' in attr_name:
-                        shape_data.setdefault('fill_color', attr_val)
-                    elif local_attr == 'border-color' and 'color' in attr_name:
-                        shape_data.setdefault('stroke_color', attr_val)
-                shapes[bpmn_element] = shape_data
-
-        elif local_tag == 'BPMNEdge':
-            bpmn_element = elem.get('bpmnElement')
-            waypoints = []
-            label_bounds = None
-            for child in elem:
-                child_tag = child.tag.split('}')[-1] if '}' in child.tag else child.tag
-                if child_tag == 'waypoint':
-                    waypoints.append({
-                        'x': float(child.get('x', 0)),
-                        'y': float(child.get('y', 0)),
-                    })
-                elif child_tag == 'BPMNLabel':
-                    for lbl_child in child:
-                        lbl_tag = lbl_child.tag.split('}')[-1] if '}' in lbl_child.tag else lbl_child.tag
-                        if lbl_tag == 'Bounds':
-                            label_bounds = {
-                                'x': float(lbl_child.get('x', 0)),
-                                'y': float(lbl_child.get('y', 0)),
-                                'w': float(lbl_child.get('width', 40)),
-                                'h': float(lbl_child.get('height', 14)),
-                            }
-                            break
-            if bpmn_element and waypoints:
-                edges[bpmn_element] = {'waypoints': waypoints}
-                if label_bounds:
-                    edges[bpmn_element]['label'] = label_bounds
-
     return elements, flows, shapes, edges, participant_lanes
 
 
 def get_element_category(elem_type):
     """Return shape category for a BPMN element type."""
-    if elem_type in EVENT_START:
-        return 'start_event'
-    elif elem_type in EVENT_END:
-        return 'end_event'
-    elif elem_type in EVENT_INTERMEDIATE:
-        return 'intermediate_event'
-    elif elem_type in GATEWAY_TYPES:
-        return 'gateway'
-    elif elem_type in ('participant',):
-        return 'participant'
-    elif elem_type in ('lane',):
-        return 'lane'
-    elif elem_type == 'textAnnotation':
-        return 'annotation'
-    elif elem_type in TASK_TYPES:
-        return 'task'
-    return 'task'
+    return _ELEMENT_CATEGORY.get(elem_type, 'task')
 
 
 # ── VSDX Generator ───────────────────────────────────────────────────────────
 # Generate .vsdx directly by building the Open XML Package (ZIP of XML files)
 
 def _r(val):
-    """Round a float to 4 decimal places for clean XML output."""
+    """Round a float to 4 decimal places for clean XML output.
+    The uncached per-shape/per-waypoint emitters call round(val, 4) inline
+    instead, which skips this Python-level frame on their hot paths."""
     return round(val, 4)
 
 
+# Formatted round(val, 4) strings for waypoint-level coordinates. Connectors in
+# a diagram share endpoints and grid-aligned offsets, so most local coordinates
+# repeat; caching the text skips both the rounding and the float repr.
+_COORD_TEXT = {}
+_COORD_TEXT_MAX = 65536
+
+
+def _coord_text(val):
+    """Return str(round(val, 4)), memoized in a bounded module cache."""
+    text = _COORD_TEXT.get(val)
+    if text is None:
+        if len(_COORD_TEXT) >= _COORD_TEXT_MAX:
+            _COORD_TEXT.clear()
+        text = _COORD_TEXT[val] = str(round(val, 4))
+    return text
+
+
 def compute_bounds(shapes, edges):
     """Compute bounding box of all BPMN coordinates in pixels.
     Returns (min_x, min_y, max_x, max_y)."""
@@ -288,8 +401,8 @@ def compute_page_size(min_x, min_y, max_x, max_y):
     total_w = (max_x - min_x) + 2 * margin
     total_h = (max_y - min_y) + 2 * margin
 
-    page_w = total_w / PPI
-    page_h = total_h / PPI
+    page_w = total_w * INV_PPI
+    page_h = total_h * INV_PPI
     # Minimum page size
     page_w = max(page_w, 11.0)
     page_h = max(page_h, 8.5)
@@ -300,18 +413,35 @@ def bpmn_to_visio_coords(bpmn_x, bpmn_y, bpmn_w, bpmn_h, page_h, offset_x, offse
     """Convert BPMN coordinates (top-left origin, pixels) to Visio (bottom-left origin, inches).
     offset_x/offset_y shift all coordinates so the minimum becomes the margin.
     Returns center point (PinX, PinY) and size (Width, Height)."""
-    w = bpmn_w / PPI
-    h = bpmn_h / PPI
-    pin_x = (bpmn_x - offset_x + bpmn_w / 2) / PPI
-    pin_y = page_h - (bpmn_y - offset_y + bpmn_h / 2) / PPI
+    w = bpmn_w * INV_PPI
+    h = bpmn_h * INV_PPI
+    pin_x = (bpmn_x - offset_x + bpmn_w * 0.5) * INV_PPI
+    pin_y = page_h - (bpmn_y - offset_y + bpmn_h * 0.5) * INV_PPI
     return pin_x, pin_y, w, h
 
 
 def wp_to_visio(x, y, page_h, offset_x, offset_y):
     """Convert a single waypoint to Visio coordinates."""
-    return (x - offset_x) / PPI, page_h - (y - offset_y) / PPI
+    return (x - offset_x) * INV_PPI, page_h - (y - offset_y) * INV_PPI
+
+
+# Unit-circle samples for the polygonal circle/pentagon markers, evaluated once
+# at import so marker emission is a scale + translate with no trig calls.
+_UNIT_CIRCLE_12 = [(math.cos(2 * math.pi * i / 12), math.sin(2 * math.pi * i / 12))
+                   for i in range(12)]
+_UNIT_PENTAGON = [(math.cos(2 * math.pi * i / 5 - math.pi / 2),
+                   math.sin(2 * math.pi * i / 5 - math.pi / 2))
+                  for i in range(5)]
+_CLOCK_HAND = (math.cos(math.pi / 3), math.sin(math.pi / 3))  # timer marker hand at 60°
 
+# Marker geometry is drawn as unfilled, stroked sections after the shape body
+# (IX=0); a marker uses IX=1 and, for two-part markers, IX=2.
+_MARKER_GEOM_OPEN = '<Section N="Geometry" IX="1">\n<Cell N="NoFill" V="1"/>\n<Cell N="NoLine" V="0"/>\n'
+_MARKER_GEOM_NEXT = '</Section>\n<Section N="Geometry" IX="2">\n<Cell N="NoFill" V="1"/>\n<Cell N="NoLine" V="0"/>\n'
+_GEOM_CLOSE = '</Section>'
 
+
+@lru_cache(maxsize=4096, typed=True)
 def _marker_geometry_xml(elem_type, w_in, h_in):
     """Return additional Geometry section(s) for BPMN markers inside shapes.
 
@@ -327,64 +457,55 @@ def _marker_geometry_xml(elem_type, w_in, h_in):
         # X marker inside diamond
         cx, cy = hw, hh
         d = _r(ms * 0.7)
-        return f'''<Section N="Geometry" IX="1">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-<Row T="MoveTo" IX="1"><Cell N="X" V="{_r(cx - d)}"/><Cell N="Y" V="{_r(cy - d)}"/></Row>
+        return _MARKER_GEOM_OPEN + f'''<Row T="MoveTo" IX="1"><Cell N="X" V="{_r(cx - d)}"/><Cell N="Y" V="{_r(cy - d)}"/></Row>
 <Row T="LineTo" IX="2"><Cell N="X" V="{_r(cx + d)}"/><Cell N="Y" V="{_r(cy + d)}"/></Row>
 <Row T="MoveTo" IX="3"><Cell N="X" V="{_r(cx + d)}"/><Cell N="Y" V="{_r(cy - d)}"/></Row>
 <Row T="LineTo" IX="4"><Cell N="X" V="{_r(cx - d)}"/><Cell N="Y" V="{_r(cy + d)}"/></Row>
-</Section>'''
+''' + _GEOM_CLOSE
 
     elif elem_type == 'parallelGateway':
         # + marker inside diamond
         cx, cy = hw, hh
         d = _r(ms * 0.8)
-        return f'''<Section N="Geometry" IX="1">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-<Row T="MoveTo" IX="1"><Cell N="X" V="{_r(cx)}"/><Cell N="Y" V="{_r(cy - d)}"/></Row>
+        return _MARKER_GEOM_OPEN + f'''<Row T="MoveTo" IX="1"><Cell N="X" V="{_r(cx)}"/><Cell N="Y" V="{_r(cy - d)}"/></Row>
 <Row T="LineTo" IX="2"><Cell N="X" V="{_r(cx)}"/><Cell N="Y" V="{_r(cy + d)}"/></Row>
 <Row T="MoveTo" IX="3"><Cell N="X" V="{_r(cx - d)}"/><Cell N="Y" V="{_r(cy)}"/></Row>
 <Row T="LineTo" IX="4"><Cell N="X" V="{_r(cx + d)}"/><Cell N="Y" V="{_r(cy)}"/></Row>
-</Section>'''
+''' + _GEOM_CLOSE
 
     elif elem_type == 'inclusiveGateway':
         # O marker (circle) inside diamond — approximate with octagon
         cx, cy = hw, hh
         r = ms * 0.6
-        rows = ''
+        parts = []
         n_pts = 12
         for i in range(n_pts + 1):
-            angle = 2 * math.pi * (i % n_pts) / n_pts
-            px = _r(cx + r * math.cos(angle))
-            py = _r(cy + r * math.sin(angle))
+            cos_a, sin_a = _UNIT_CIRCLE_12[i % n_pts]
+            px = _r(cx + r * cos_a)
+            py = _r(cy + r * sin_a)
             tag = 'MoveTo' if i == 0 else 'LineTo'
-            rows += f'<Row T="{tag}" IX="{i + 1}"><Cell N="X" V="{px}"/><Cell N="Y" V="{py}"/></Row>\n'
-        return f'''<Section N="Geometry" IX="1">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-{rows}</Section>'''
+            parts.append(f'<Row T="{tag}" IX="{i + 1}"><Cell N="X" V="{px}"/><Cell N="Y" V="{py}"/></Row>\n')
+        rows = ''.join(parts)
+        return _MARKER_GEOM_OPEN + rows + _GEOM_CLOSE
 
     elif elem_type == 'eventBasedGateway':
         # Pentagon inside diamond
         cx, cy = hw, hh
         r = ms * 0.6
-        rows = ''
+        parts = []
         for i in range(6):
-            angle = 2 * math.pi * (i % 5) / 5 - math.pi / 2
-            px = _r(cx + r * math.cos(angle))
-            py = _r(cy + r * math.sin(angle))
+            cos_a, sin_a = _UNIT_PENTAGON[i % 5]
+            px = _r(cx + r * cos_a)
+            py = _r(cy + r * sin_a)
             tag = 'MoveTo' if i == 0 else 'LineTo'
-            rows += f'<Row T="{tag}" IX="{i + 1}"><Cell N="X" V="{px}"/><Cell N="Y" V="{py}"/></Row>\n'
-        return f'''<Section N="Geometry" IX="1">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-{rows}</Section>'''
+            parts.append(f'<Row T="{tag}" IX="{i + 1}"><Cell N="X" V="{px}"/><Cell N="Y" V="{py}"/></Row>\n')
+        rows = ''.join(parts)
+        return _MARKER_GEOM_OPEN + rows + _GEOM_CLOSE
 
     return ''
 
 
+@lru_cache(maxsize=4096, typed=True)
 def _event_marker_geometry_xml(event_def, w_in, h_in):
     """Return Geometry section for event definition markers (envelope, timer, etc.)."""
     hw = _r(w_in / 2)
@@ -400,69 +521,54 @@ def _event_marker_geometry_xml(event_def, w_in, h_in):
         b, t = _r(cy - eh), _r(cy + eh)
         mid_x = hw
         mid_y = _r(cy + eh * 0.3)
-        return f'''<Section N="Geometry" IX="1">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-<Row T="MoveTo" IX="1"><Cell N="X" V="{l}"/><Cell N="Y" V="{b}"/></Row>
+        return _MARKER_GEOM_OPEN + f'''<Row T="MoveTo" IX="1"><Cell N="X" V="{l}"/><Cell N="Y" V="{b}"/></Row>
 <Row T="LineTo" IX="2"><Cell N="X" V="{r_x}"/><Cell N="Y" V="{b}"/></Row>
 <Row T="LineTo" IX="3"><Cell N="X" V="{r_x}"/><Cell N="Y" V="{t}"/></Row>
 <Row T="LineTo" IX="4"><Cell N="X" V="{l}"/><Cell N="Y" V="{t}"/></Row>
 <Row T="LineTo" IX="5"><Cell N="X" V="{l}"/><Cell N="Y" V="{b}"/></Row>
-</Section>
-<Section N="Geometry" IX="2">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-<Row T="MoveTo" IX="1"><Cell N="X" V="{l}"/><Cell N="Y" V="{t}"/></Row>
+''' + _MARKER_GEOM_NEXT + f'''<Row T="MoveTo" IX="1"><Cell N="X" V="{l}"/><Cell N="Y" V="{t}"/></Row>
 <Row T="LineTo" IX="2"><Cell N="X" V="{mid_x}"/><Cell N="Y" V="{mid_y}"/></Row>
 <Row T="LineTo" IX="3"><Cell N="X" V="{r_x}"/><Cell N="Y" V="{t}"/></Row>
-</Section>'''
+''' + _GEOM_CLOSE
 
     elif event_def == 'timerEventDefinition':
         # Clock marker: circle with hands
         cx, cy = float(hw), float(hh)
         r = ms * 0.8
-        rows = ''
+        parts = []
         n_pts = 12
         for i in range(n_pts + 1):
-            angle = 2 * math.pi * (i % n_pts) / n_pts
-            px = _r(cx + r * math.cos(angle))
-            py = _r(cy + r * math.sin(angle))
+            cos_a, sin_a = _UNIT_CIRCLE_12[i % n_pts]
+            px = _r(cx + r * cos_a)
+            py = _r(cy + r * sin_a)
             tag = 'MoveTo' if i == 0 else 'LineTo'
-            rows += f'<Row T="{tag}" IX="{i + 1}"><Cell N="X" V="{px}"/><Cell N="Y" V="{py}"/></Row>\n'
+            parts.append(f'<Row T="{tag}" IX="{i + 1}"><Cell N="X" V="{px}"/><Cell N="Y" V="{py}"/></Row>\n')
+        rows = ''.join(parts)
         # Clock hands
-        hand1_x = _r(cx + r * 0.5 * math.cos(math.pi / 3))
-        hand1_y = _r(cy + r * 0.5 * math.sin(math.pi / 3))
+        hand1_x = _r(cx + r * 0.5 * _CLOCK_HAND[0])
+        hand1_y = _r(cy + r * 0.5 * _CLOCK_HAND[1])
         hand2_x = _r(cx)
         hand2_y = _r(cy + r * 0.7)
-        return f'''<Section N="Geometry" IX="1">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-{rows}</Section>
-<Section N="Geometry" IX="2">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-<Row T="MoveTo" IX="1"><Cell N="X" V="{hw}"/><Cell N="Y" V="{hh}"/></Row>
+        return _MARKER_GEOM_OPEN + rows + _MARKER_GEOM_NEXT + f'''<Row T="MoveTo" IX="1"><Cell N="X" V="{hw}"/><Cell N="Y" V="{hh}"/></Row>
 <Row T="LineTo" IX="2"><Cell N="X" V="{hand1_x}"/><Cell N="Y" V="{hand1_y}"/></Row>
 <Row T="MoveTo" IX="3"><Cell N="X" V="{hw}"/><Cell N="Y" V="{hh}"/></Row>
 <Row T="LineTo" IX="4"><Cell N="X" V="{hand2_x}"/><Cell N="Y" V="{hand2_y}"/></Row>
-</Section>'''
+''' + _GEOM_CLOSE
 
     elif event_def == 'signalEventDefinition':
         # Triangle marker
         cx, cy = float(hw), float(hh)
         s = ms * 0.8
-        return f'''<Section N="Geometry" IX="1">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-<Row T="MoveTo" IX="1"><Cell N="X" V="{hw}"/><Cell N="Y" V="{_r(cy + s)}"/></Row>
+        return _MARKER_GEOM_OPEN + f'''<Row T="MoveTo" IX="1"><Cell N="X" V="{hw}"/><Cell N="Y" V="{_r(cy + s)}"/></Row>
 <Row T="LineTo" IX="2"><Cell N="X" V="{_r(cx - s)}"/><Cell N="Y" V="{_r(cy - s * 0.6)}"/></Row>
 <Row T="LineTo" IX="3"><Cell N="X" V="{_r(cx + s)}"/><Cell N="Y" V="{_r(cy - s * 0.6)}"/></Row>
 <Row T="LineTo" IX="4"><Cell N="X" V="{hw}"/><Cell N="Y" V="{_r(cy + s)}"/></Row>
-</Section>'''
+''' + _GEOM_CLOSE
 
     return ''
 
 
+@lru_cache(maxsize=4096, typed=True)
 def _subprocess_marker_geometry_xml(w_in, h_in):
     """Return Geometry sections for a callActivity/subProcess [+] marker.
 
@@ -480,54 +586,38 @@ def _subprocess_marker_geometry_xml(w_in, h_in):
     cross = hbox * 0.65
 
     # Geometry IX=1: square border
-    sq = f'''<Section N="Geometry" IX="1">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-<Row T="MoveTo" IX="1"><Cell N="X" V="{_r(cx - hbox)}"/><Cell N="Y" V="{_r(by - hbox)}"/></Row>
+    sq = f'''<Row T="MoveTo" IX="1"><Cell N="X" V="{_r(cx - hbox)}"/><Cell N="Y" V="{_r(by - hbox)}"/></Row>
 <Row T="LineTo" IX="2"><Cell N="X" V="{_r(cx + hbox)}"/><Cell N="Y" V="{_r(by - hbox)}"/></Row>
 <Row T="LineTo" IX="3"><Cell N="X" V="{_r(cx + hbox)}"/><Cell N="Y" V="{_r(by + hbox)}"/></Row>
 <Row T="LineTo" IX="4"><Cell N="X" V="{_r(cx - hbox)}"/><Cell N="Y" V="{_r(by + hbox)}"/></Row>
 <Row T="LineTo" IX="5"><Cell N="X" V="{_r(cx - hbox)}"/><Cell N="Y" V="{_r(by - hbox)}"/></Row>
-</Section>'''
+'''
 
     # Geometry IX=2: plus sign (+)
-    plus = f'''<Section N="Geometry" IX="2">
-<Cell N="NoFill" V="1"/>
-<Cell N="NoLine" V="0"/>
-<Row T="MoveTo" IX="1"><Cell N="X" V="{cx}"/><Cell N="Y" V="{_r(by - cross)}"/></Row>
+    plus = f'''<Row T="MoveTo" IX="1"><Cell N="X" V="{cx}"/><Cell N="Y" V="{_r(by - cross)}"/></Row>
 <Row T="LineTo" IX="2"><Cell N="X" V="{cx}"/><Cell N="Y" V="{_r(by + cross)}"/></Row>
 <Row T="MoveTo" IX="3"><Cell N="X" V="{_r(cx - cross)}"/><Cell N="Y" V="{_r(by)}"/></Row>
 <Row T="LineTo" IX="4"><Cell N="X" V="{_r(cx + cross)}"/><Cell N="Y" V="{_r(by)}"/></Row>
-</Section>'''
+'''
 
-    return sq + '\n' + plus
+    return _MARKER_GEOM_OPEN + sq + _MARKER_GEOM_NEXT + plus + _GEOM_CLOSE
 
 
-def _shape_geometry_xml(category, w_in, h_in, header_width_in=0):
-    """Return Visio Geometry Section XML for a shape category."""
-    hw = _r(w_in / 2)
-    hh = _r(h_in / 2)
-    w_in = _r(w_in)
-    h_in = _r(h_in)
-
-    if category in ('start_event', 'end_event', 'intermediate_event'):
-        # Ellipse (circle)
-        return f'''<Section N="Geometry" IX="0">
+# Static skeletons for _shape_geometry_xml, filled with str.format per shape
+_ELLIPSE_GEOMETRY = '''<Section N="Geometry" IX="0">
 <Cell N="NoFill" V="0"/>
 <Cell N="NoLine" V="0"/>
 <Row T="Ellipse" IX="1">
 <Cell N="X" V="{hw}" F="Width*0.5"/>
 <Cell N="Y" V="{hh}" F="Height*0.5"/>
-<Cell N="A" V="{w_in}" F="Width*1"/>
+<Cell N="A" V="{w}" F="Width*1"/>
 <Cell N="B" V="{hh}" F="Height*0.5"/>
 <Cell N="C" V="{hw}" F="Width*0.5"/>
-<Cell N="D" V="{h_in}" F="Height*1"/>
+<Cell N="D" V="{h}" F="Height*1"/>
 </Row>
 </Section>'''
 
-    elif category == 'annotation':
-        # Open bracket shape (left border only, like BPMN text annotation)
-        return f'''<Section N="Geometry" IX="0">
+_ANNOTATION_GEOMETRY = '''<Section N="Geometry" IX="0">
 <Cell N="NoFill" V="1"/>
 <Cell N="NoLine" V="0"/>
 <Row T="MoveTo" IX="1">
@@ -540,17 +630,15 @@ def _shape_geometry_xml(category, w_in, h_in, header_width_in=0):
 </Row>
 <Row T="LineTo" IX="3">
 <Cell N="X" V="0"/>
-<Cell N="Y" V="{h_in}"/>
+<Cell N="Y" V="{h}"/>
 </Row>
 <Row T="LineTo" IX="4">
 <Cell N="X" V="0.15"/>
-<Cell N="Y" V="{h_in}"/>
+<Cell N="Y" V="{h}"/>
 </Row>
 </Section>'''
 
-    elif category in ('participant', 'lane'):
-        # Rectangle for pools/lanes, with header separator if header_width_in > 0
-        base_geom = f'''<Section N="Geometry" IX="0">
+_RECT_GEOMETRY = '''<Section N="Geometry" IX="0">
 <Cell N="NoFill" V="0"/>
 <Cell N="NoLine" V="0"/>
 <Row T="MoveTo" IX="1">
@@ -558,42 +646,38 @@ def _shape_geometry_xml(category, w_in, h_in, header_width_in=0):
 <Cell N="Y" V="0"/>
 </Row>
 <Row T="LineTo" IX="2">
-<Cell N="X" V="{w_in}"/>
+<Cell N="X" V="{w}"/>
 <Cell N="Y" V="0"/>
 </Row>
 <Row T="LineTo" IX="3">
-<Cell N="X" V="{w_in}"/>
-<Cell N="Y" V="{h_in}"/>
+<Cell N="X" V="{w}"/>
+<Cell N="Y" V="{h}"/>
 </Row>
 <Row T="LineTo" IX="4">
 <Cell N="X" V="0"/>
-<Cell N="Y" V="{h_in}"/>
+<Cell N="Y" V="{h}"/>
 </Row>
 <Row T="LineTo" IX="5">
 <Cell N="X" V="0"/>
 <Cell N="Y" V="0"/>
 </Row>
 </Section>'''
-        if header_width_in > 0:
-            hw_r = _r(header_width_in)
-            base_geom += f'''
+
+_HEADER_SEPARATOR_GEOMETRY = '''
 <Section N="Geometry" IX="1">
 <Cell N="NoFill" V="1"/>
 <Cell N="NoLine" V="0"/>
 <Row T="MoveTo" IX="1">
-<Cell N="X" V="{hw_r}"/>
+<Cell N="X" V="{x}"/>
 <Cell N="Y" V="0"/>
 </Row>
 <Row T="LineTo" IX="2">
-<Cell N="X" V="{hw_r}"/>
-<Cell N="Y" V="{h_in}"/>
+<Cell N="X" V="{x}"/>
+<Cell N="Y" V="{h}"/>
 </Row>
 </Section>'''
-        return base_geom
 
-    elif category == 'gateway':
-        # Diamond
-        return f'''<Section N="Geometry" IX="0">
+_DIAMOND_GEOMETRY = '''<Section N="Geometry" IX="0">
 <Cell N="NoFill" V="0"/>
 <Cell N="NoLine" V="0"/>
 <Row T="MoveTo" IX="1">
@@ -601,12 +685,12 @@ def _shape_geometry_xml(category, w_in, h_in, header_width_in=0):
 <Cell N="Y" V="0"/>
 </Row>
 <Row T="LineTo" IX="2">
-<Cell N="X" V="{w_in}" F="Width*1"/>
+<Cell N="X" V="{w}" F="Width*1"/>
 <Cell N="Y" V="{hh}" F="Height*0.5"/>
 </Row>
 <Row T="LineTo" IX="3">
 <Cell N="X" V="{hw}" F="Width*0.5"/>
-<Cell N="Y" V="{h_in}" F="Height*1"/>
+<Cell N="Y" V="{h}" F="Height*1"/>
 </Row>
 <Row T="LineTo" IX="4">
 <Cell N="X" V="0"/>
@@ -618,34 +702,40 @@ def _shape_geometry_xml(category, w_in, h_in, header_width_in=0):
 </Row>
 </Section>'''
 
+
+@lru_cache(maxsize=4096, typed=True)
+def _shape_geometry_xml(category, w_in, h_in, header_width_in=0):
+    """Return Visio Geometry Section XML for a shape category."""
+    hw = _r(w_in / 2)
+    hh = _r(h_in / 2)
+    w_in = _r(w_in)
+    h_in = _r(h_in)
+
+    if category in ('start_event', 'end_event', 'intermediate_event'):
+        # Ellipse (circle)
+        return _ELLIPSE_GEOMETRY.format(hw=hw, hh=hh, w=w_in, h=h_in)
+
+    elif category == 'annotation':
+        # Open bracket shape (left border only, like BPMN text annotation)
+        return _ANNOTATION_GEOMETRY.format(h=h_in)
+
+    elif category in ('participant', 'lane'):
+        # Rectangle for pools/lanes, with header separator if header_width_in > 0
+        base_geom = _RECT_GEOMETRY.format(w=w_in, h=h_in)
+        if header_width_in > 0:
+            base_geom += _HEADER_SEPARATOR_GEOMETRY.format(x=_r(header_width_in), h=h_in)
+        return base_geom
+
+    elif category == 'gateway':
+        # Diamond
+        return _DIAMOND_GEOMETRY.format(hw=hw, hh=hh, w=w_in, h=h_in)
+
     else:
         # Rectangle for tasks (Rounding cell is added at shape level for rounded corners)
-        return f'''<Section N="Geometry" IX="0">
-<Cell N="NoFill" V="0"/>
-<Cell N="NoLine" V="0"/>
-<Row T="MoveTo" IX="1">
-<Cell N="X" V="0"/>
-<Cell N="Y" V="0"/>
-</Row>
-<Row T="LineTo" IX="2">
-<Cell N="X" V="{w_in}"/>
-<Cell N="Y" V="0"/>
-</Row>
-<Row T="LineTo" IX="3">
-<Cell N="X" V="{w_in}"/>
-<Cell N="Y" V="{h_in}"/>
-</Row>
-<Row T="LineTo" IX="4">
-<Cell N="X" V="0"/>
-<Cell N="Y" V="{h_in}"/>
-</Row>
-<Row T="LineTo" IX="5">
-<Cell N="X" V="0"/>
-<Cell N="Y" V="0"/>
-</Row>
-</Section>'''
+        return _RECT_GEOMETRY.format(w=w_in, h=h_in)
 
 
+@lru_cache(maxsize=256, typed=True)
 def _fill_xml(category, fill_color=None):
     """Return fill color cells based on element category or per-shape BPMN color."""
     if fill_color:
@@ -659,6 +749,7 @@ def _fill_xml(category, fill_color=None):
         return '<Cell N="FillForegnd" V="#FFFFFF"/><Cell N="FillForegndTrans" V="0"/>'
 
 
+@lru_cache(maxsize=256, typed=True)
 def _line_xml(category, stroke_color=None, elem_type=''):
     """Return line style cells."""
     if category == 'end_event':
@@ -684,6 +775,13 @@ def _escape_xml(text):
     """Escape text for XML content."""
     if not text:
         return ''
+    # Most labels contain nothing to escape; a few substring tests are about
+    # twice as cheap as five no-op replace() scans.
+    if ('&' not in text and '<' not in text and '>' not in text
+            and '"' not in text and "'" not in text):
+        return text
+    # Chained str.replace is deliberate: for label-sized strings it measures
+    # 3-8x faster on CPython than str.translate with a multi-char mapping table.
     text = text.replace('&', '&amp;')
     text = text.replace('<', '&lt;')
     text = text.replace('>', '&gt;')
@@ -700,6 +798,7 @@ def _text_xml(name):
     return f'<Text>{_escape_xml(name)}</Text>'
 
 
+@lru_cache(maxsize=256, typed=True)
 def _char_section(category, font_size_pt=8, text_color=None):
     """Return Character section for text formatting."""
     # Visio Size cell uses inches: pt / 72 = inches
@@ -726,6 +825,106 @@ def _para_section(halign=1):
 </Section>'''
 
 
+def _text_block_pool_lane(w, h, label_offset, header_width_in, is_horizontal):
+    """Pools/lanes: text in the header band, or centered when there is none."""
+    half_w = round(w / 2, 4)
+    half_h = round(h / 2, 4)
+    if header_width_in > 0 and is_horizontal:
+        # Horizontal pool/lane: vertical text in left header band
+        # TxtAngle = π/2 (90° CCW) for bottom-to-top reading
+        # When rotated 90°, TxtWidth becomes visual height and TxtHeight
+        # becomes visual width. So we set TxtWidth=h (reading length along
+        # the lane) and TxtHeight=band_w (cross-direction for single line).
+        band_w = header_width_in
+        half_band = round(band_w / 2, 4)
+        return (f'<Cell N="TxtAngle" V="1.5708"/>\n'
+                f'<Cell N="TxtPinX" V="{half_band}"/>\n'
+                f'<Cell N="TxtPinY" V="{half_h}"/>\n'
+                f'<Cell N="TxtWidth" V="{round(h, 4)}"/>\n'
+                f'<Cell N="TxtHeight" V="{round(band_w, 4)}"/>\n'
+                f'<Cell N="TxtLocPinX" V="{half_h}"/>\n'
+                f'<Cell N="TxtLocPinY" V="{half_band}"/>')
+    elif header_width_in > 0 and not is_horizontal:
+        # Vertical pool/lane: horizontal text in top header band
+        band_h = header_width_in
+        half_band = round(band_h / 2, 4)
+        return (f'<Cell N="TxtAngle" V="0"/>\n'
+                f'<Cell N="TxtPinX" V="{half_w}"/>\n'
+                f'<Cell N="TxtPinY" V="{round(h - band_h / 2, 4)}"/>\n'
+                f'<Cell N="TxtWidth" V="{round(w, 4)}"/>\n'
+                f'<Cell N="TxtHeight" V="{round(band_h, 4)}"/>\n'
+                f'<Cell N="TxtLocPinX" V="{half_w}"/>\n'
+                f'<Cell N="TxtLocPinY" V="{half_band}"/>')
+    else:
+        # No lanes / collapsed pool: centered text
+        return (f'<Cell N="TxtAngle" V="0"/>\n'
+                f'<Cell N="TxtPinX" V="{half_w}"/>\n'
+                f'<Cell N="TxtPinY" V="{half_h}"/>\n'
+                f'<Cell N="TxtWidth" V="{round(w, 4)}"/>\n'
+                f'<Cell N="TxtHeight" V="{round(h, 4)}"/>\n'
+                f'<Cell N="TxtLocPinX" V="{half_w}"/>\n'
+                f'<Cell N="TxtLocPinY" V="{half_h}"/>')
+
+
+def _text_block_event_like(w, h, label_offset, header_width_in, is_horizontal):
+    """Gateways/events: text at the BPMN label position, else below the shape."""
+    if label_offset:
+        dx, dy, lw, lh = label_offset  # dx > 0: right of center; dy > 0: below (BPMN Y)
+        txt_w = max(lw, 0.8)
+        txt_h = max(lh, 0.25)
+        # In Visio local coords: origin at bottom-left of shape
+        # Shape center in local coords = (w/2, h/2)
+        # BPMN Y down = Visio Y up, so negate dy
+        txt_pin_x = w / 2 + dx
+        txt_pin_y = h / 2 - dy
+        return (f'<Cell N="TxtAngle" V="0"/>\n'
+                f'<Cell N="TxtPinX" V="{round(txt_pin_x, 4)}"/>\n'
+                f'<Cell N="TxtPinY" V="{round(txt_pin_y, 4)}"/>\n'
+                f'<Cell N="TxtWidth" V="{round(txt_w, 4)}"/>\n'
+                f'<Cell N="TxtHeight" V="{round(txt_h, 4)}"/>\n'
+                f'<Cell N="TxtLocPinX" V="{round(txt_w / 2, 4)}"/>\n'
+                f'<Cell N="TxtLocPinY" V="{round(txt_h / 2, 4)}"/>')
+    else:
+        # Fallback: position below shape
+        txt_w = max(w * 2.5, 1.2)
+        txt_h = 0.35
+        return (f'<Cell N="TxtAngle" V="0"/>\n'
+                f'<Cell N="TxtPinX" V="{round(w / 2, 4)}"/>\n'
+                f'<Cell N="TxtPinY" V="{round(-txt_h / 2 - 0.04, 4)}"/>\n'
+                f'<Cell N="TxtWidth" V="{round(txt_w, 4)}"/>\n'
+                f'<Cell N="TxtHeight" V="{round(txt_h, 4)}"/>\n'
+                f'<Cell N="TxtLocPinX" V="{round(txt_w / 2, 4)}"/>\n'
+                f'<Cell N="TxtLocPinY" V="{round(txt_h / 2, 4)}"/>')
+
+
+_DEFAULT_TEXT_BLOCK = ('<Cell N="TxtAngle" V="0"/>\n'
+                       '<Cell N="TxtPinX" V="{half_w}" F="Width*0.5"/>\n'
+                       '<Cell N="TxtPinY" V="{half_h}" F="Height*0.5"/>\n'
+                       '<Cell N="TxtWidth" V="{w}" F="Width*1"/>\n'
+                       '<Cell N="TxtHeight" V="{h}" F="Height*1"/>\n'
+                       '<Cell N="TxtLocPinX" V="{half_w}" F="TxtWidth*0.5"/>\n'
+                       '<Cell N="TxtLocPinY" V="{half_h}" F="TxtHeight*0.5"/>')
+
+
+def _text_block_default(w, h, label_offset, header_width_in, is_horizontal):
+    """Tasks/annotations: horizontal text centered in shape — must set all properties explicitly.
+    Only the size varies, so the cells come from the _DEFAULT_TEXT_BLOCK template."""
+    return _DEFAULT_TEXT_BLOCK.format(half_w=round(w / 2, 4), half_h=round(h / 2, 4),
+                                      w=round(w, 4), h=round(h, 4))
+
+
+# Shape category -> text block builder (everything else uses _text_block_default)
+_TEXT_BLOCK_BUILDERS = {
+    'participant': _text_block_pool_lane,
+    'lane': _text_block_pool_lane,
+    'gateway': _text_block_event_like,
+    'start_event': _text_block_event_like,
+    'end_event': _text_block_event_like,
+    'intermediate_event': _text_block_event_like,
+}
+
+
+@lru_cache(maxsize=4096, typed=True)
 def _text_block_xml(category, w, h, label_offset=None, header_width_in=0, is_horizontal=True):
     """Return TextBlock cells for text positioning.
     All shapes get explicit TxtWidth/TxtHeight to ensure correct text layout.
@@ -738,83 +937,52 @@ def _text_block_xml(category, w, h, label_offset=None, header_width_in=0, is_hor
     For gateways/events:
       - Uses actual BPMN label position from label_offset when available
 
-    label_offset: dict with 'dx', 'dy' (inches), 'lw', 'lh' (inches).
+    label_offset: tuple (dx, dy, lw, lh) in inches, hashable so results can be
+                  cached — same-sized shapes share one text block.
     header_width_in: computed header band width in inches (from BPMN coordinates).
     is_horizontal: whether the pool/lane is horizontal (header on left).
     """
-    if category in ('participant', 'lane'):
-        if header_width_in > 0 and is_horizontal:
-            # Horizontal pool/lane: vertical text in left header band
-            # TxtAngle = π/2 (90° CCW) for bottom-to-top reading
-            # When rotated 90°, TxtWidth becomes visual height and TxtHeight
-            # becomes visual width. So we set TxtWidth=h (reading length along
-            # the lane) and TxtHeight=band_w (cross-direction for single line).
-            band_w = header_width_in
-            return (f'<Cell N="TxtAngle" V="1.5708"/>\n'
-                    f'<Cell N="TxtPinX" V="{_r(band_w / 2)}"/>\n'
-                    f'<Cell N="TxtPinY" V="{_r(h / 2)}"/>\n'
-                    f'<Cell N="TxtWidth" V="{_r(h)}"/>\n'
-                    f'<Cell N="TxtHeight" V="{_r(band_w)}"/>\n'
-                    f'<Cell N="TxtLocPinX" V="{_r(h / 2)}"/>\n'
-                    f'<Cell N="TxtLocPinY" V="{_r(band_w / 2)}"/>')
-        elif header_width_in > 0 and not is_horizontal:
-            # Vertical pool/lane: horizontal text in top header band
-            band_h = header_width_in
-            return (f'<Cell N="TxtAngle" V="0"/>\n'
-                    f'<Cell N="TxtPinX" V="{_r(w / 2)}"/>\n'
-                    f'<Cell N="TxtPinY" V="{_r(h - band_h / 2)}"/>\n'
-                    f'<Cell N="TxtWidth" V="{_r(w)}"/>\n'
-                    f'<Cell N="TxtHeight" V="{_r(band_h)}"/>\n'
-                    f'<Cell N="TxtLocPinX" V="{_r(w / 2)}"/>\n'
-                    f'<Cell N="TxtLocPinY" V="{_r(band_h / 2)}"/>')
-        else:
-            # No lanes / collapsed pool: centered text
-            return (f'<Cell N="TxtAngle" V="0"/>\n'
-                    f'<Cell N="TxtPinX" V="{_r(w / 2)}"/>\n'
-                    f'<Cell N="TxtPinY" V="{_r(h / 2)}"/>\n'
-                    f'<Cell N="TxtWidth" V="{_r(w)}"/>\n'
-                    f'<Cell N="TxtHeight" V="{_r(h)}"/>\n'
-                    f'<Cell N="TxtLocPinX" V="{_r(w / 2)}"/>\n'
-                    f'<Cell N="TxtLocPinY" V="{_r(h / 2)}"/>')
-    elif category in ('gateway', 'start_event', 'end_event', 'intermediate_event'):
-        # Use actual BPMN label position if available
-        if label_offset:
-            dx = label_offset['dx']   # inches, positive = right of shape center
-            dy = label_offset['dy']   # inches, positive = below shape center (BPMN Y)
-            txt_w = max(label_offset['lw'], 0.8)
-            txt_h = max(label_offset['lh'], 0.25)
-            # In Visio local coords: origin at bottom-left of shape
-            # Shape center in local coords = (w/2, h/2)
-            # BPMN Y down = Visio Y up, so negate dy
-            txt_pin_x = w / 2 + dx
-            txt_pin_y = h / 2 - dy
-            return (f'<Cell N="TxtAngle" V="0"/>\n'
-                    f'<Cell N="TxtPinX" V="{_r(txt_pin_x)}"/>\n'
-                    f'<Cell N="TxtPinY" V="{_r(txt_pin_y)}"/>\n'
-                    f'<Cell N="TxtWidth" V="{_r(txt_w)}"/>\n'
-                    f'<Cell N="TxtHeight" V="{_r(txt_h)}"/>\n'
-                    f'<Cell N="TxtLocPinX" V="{_r(txt_w / 2)}"/>\n'
-                    f'<Cell N="TxtLocPinY" V="{_r(txt_h / 2)}"/>')
-        else:
-            # Fallback: position below shape
-            txt_w = max(w * 2.5, 1.2)
-            txt_h = 0.35
-            return (f'<Cell N="TxtAngle" V="0"/>\n'
-                    f'<Cell N="TxtPinX" V="{_r(w / 2)}"/>\n'
-                    f'<Cell N="TxtPinY" V="{_r(-txt_h / 2 - 0.04)}"/>\n'
-                    f'<Cell N="TxtWidth" V="{_r(txt_w)}"/>\n'
-                    f'<Cell N="TxtHeight" V="{_r(txt_h)}"/>\n'
-                    f'<Cell N="TxtLocPinX" V="{_r(txt_w / 2)}"/>\n'
-                    f'<Cell N="TxtLocPinY" V="{_r(txt_h / 2)}"/>')
-    else:
-        # Horizontal text centered in shape — must set all properties explicitly
-        return (f'<Cell N="TxtAngle" V="0"/>\n'
-                f'<Cell N="TxtPinX" V="{_r(w / 2)}" F="Width*0.5"/>\n'
-                f'<Cell N="TxtPinY" V="{_r(h / 2)}" F="Height*0.5"/>\n'
-                f'<Cell N="TxtWidth" V="{_r(w)}" F="Width*1"/>\n'
-                f'<Cell N="TxtHeight" V="{_r(h)}" F="Height*1"/>\n'
-                f'<Cell N="TxtLocPinX" V="{_r(w / 2)}" F="TxtWidth*0.5"/>\n'
-                f'<Cell N="TxtLocPinY" V="{_r(h / 2)}" F="TxtHeight*0.5"/>')
+    builder = _TEXT_BLOCK_BUILDERS.get(category, _text_block_default)
+    return builder(w, h, label_offset, header_width_in, is_horizontal)
+
+
+# Per-category label font size in points; pools/lanes scale to their header band
+_CATEGORY_FONT_SIZE = {
+    'annotation': 7,
+    'start_event': 6,
+    'end_event': 6,
+    'intermediate_event': 6,
+    'gateway': 6,
+}
+
+# Paragraph sections: annotations are left-aligned, everything else centered
+_PARA_LEFT = _para_section(halign=0)
+_PARA_CENTER = _para_section()
+
+# Literal cell runs shared by every shape/label, spliced into the templates below
+_SHAPE_COMMON_HDR = '''<Cell N="Angle" V="0"/>
+<Cell N="FlipX" V="0"/>
+<Cell N="FlipY" V="0"/>
+<Cell N="ResizeMode" V="0"/>'''
+
+_LABEL_FILL_LINE_CELLS = '''<Cell N="FillForegnd" V="#FFFFFF"/>
+<Cell N="FillForegndTrans" V="1"/>
+<Cell N="FillPattern" V="0"/>
+<Cell N="LinePattern" V="0"/>'''
+
+# Character (6pt dark grey) and centered Paragraph sections of a label shape
+_LABEL_CHAR_PARA = f'''<Section N="Character" IX="0">
+<Row IX="0">
+<Cell N="Font" V="0"/>
+<Cell N="Size" V="{round(6 / 72, 4)}"/>
+<Cell N="Color" V="#333333"/>
+</Row>
+</Section>
+<Section N="Paragraph" IX="0">
+<Row IX="0">
+<Cell N="HorzAlign" V="1"/>
+</Row>
+</Section>'''
 
 
 def build_shape_xml(shape_id, category, pin_x, pin_y, w, h, name,
@@ -830,9 +998,9 @@ def build_shape_xml(shape_id, category, pin_x, pin_y, w, h, name,
     elem_type: original BPMN element type (e.g., 'exclusiveGateway').
     event_def: event definition type (e.g., 'messageEventDefinition').
     """
-    pin_x, pin_y, w, h = _r(pin_x), _r(pin_y), _r(w), _r(h)
-    loc_pin_x = _r(w / 2)
-    loc_pin_y = _r(h / 2)
+    pin_x, pin_y, w, h = round(pin_x, 4), round(pin_y, 4), round(w, 4), round(h, 4)
+    loc_pin_x = round(w / 2, 4)
+    loc_pin_y = round(h / 2, 4)
     geom = _shape_geometry_xml(category, w, h, header_width_in=header_width_in if category in ('participant', 'lane') else 0)
     # Add BPMN markers (X for exclusive gw, + for parallel gw, envelope for message events, etc.)
     marker_geom = ''
@@ -845,32 +1013,29 @@ def build_shape_xml(shape_id, category, pin_x, pin_y, w, h, name,
     fill = _fill_xml(category, fill_color)
     line = _line_xml(category, stroke_color, elem_type=elem_type)
     text = _text_xml(name)
-    text_block = _text_block_xml(category, w, h, label_offset=label_offset,
+    offset_key = None
+    if label_offset:
+        offset_key = (label_offset['dx'], label_offset['dy'], label_offset['lw'], label_offset['lh'])
+    text_block = _text_block_xml(category, w, h, label_offset=offset_key,
                                  header_width_in=header_width_in, is_horizontal=is_horizontal)
-    if category == 'annotation':
-        font_size = 7
-    elif category in ('start_event', 'end_event', 'intermediate_event'):
-        font_size = 6
-    elif category == 'gateway':
-        font_size = 6
-    elif category in ('participant', 'lane'):
+    if category in ('participant', 'lane'):
         # Scale font to fit the header band width (avoid wrapping)
         # header_width_in is in inches; max font ~8pt for 0.3" band
         if header_width_in > 0:
             font_size = min(8, max(6, int(header_width_in * 24)))
         else:
             font_size = 9
+        label_color = stroke_color
     else:
-        font_size = 8
-    label_color = stroke_color if category in ('participant', 'lane') else None
+        font_size = _CATEGORY_FONT_SIZE.get(category, 8)
+        label_color = None
     char = _char_section(category, font_size, text_color=label_color)
-    # Left-align annotations, center everything else
-    para = _para_section(halign=0) if category == 'annotation' else _para_section()
+    para = _PARA_LEFT if category == 'annotation' else _PARA_CENTER
 
     # Add Rounding cell for task shapes to get rounded corners
     rounding_cell = ''
     if category == 'task':
-        rounding = _r(min(0.1, w * 0.1, h * 0.1))
+        rounding = round(min(0.1, w * 0.1, h * 0.1), 4)
         rounding_cell = f'<Cell N="Rounding" V="{rounding}"/>'
 
     return f'''<Shape ID="{shape_id}" NameU="Shape.{shape_id}" Type="Shape">
@@ -880,10 +1045,7 @@ def build_shape_xml(shape_id, category, pin_x, pin_y, w, h, name,
 <Cell N="Height" V="{h}"/>
 <Cell N="LocPinX" V="{loc_pin_x}" F="Width*0.5"/>
 <Cell N="LocPinY" V="{loc_pin_y}" F="Height*0.5"/>
-<Cell N="Angle" V="0"/>
-<Cell N="FlipX" V="0"/>
-<Cell N="FlipY" V="0"/>
-<Cell N="ResizeMode" V="0"/>
+{_SHAPE_COMMON_HDR}
 {text_block}
 {rounding_cell}
 {fill}
@@ -910,34 +1072,29 @@ def build_label_shape_xml(shape_id, pin_x, pin_y, lbl_w, lbl_h, text):
     """
     if not text:
         return ''
-    lbl_w = _r(max(lbl_w, 0.8))
-    lbl_h = _r(max(lbl_h, 0.25))
-    pin_x = _r(pin_x)
-    pin_y = _r(pin_y)
-    label_size = _r(6 / 72)  # 6pt
+    lbl_w = round(max(lbl_w, 0.8), 4)
+    lbl_h = round(max(lbl_h, 0.25), 4)
+    pin_x = round(pin_x, 4)
+    pin_y = round(pin_y, 4)
+    half_w = round(lbl_w / 2, 4)
+    half_h = round(lbl_h / 2, 4)
     escaped = _escape_xml(text)
     return f'''<Shape ID="{shape_id}" NameU="Label.{shape_id}" Type="Shape">
 <Cell N="PinX" V="{pin_x}"/>
 <Cell N="PinY" V="{pin_y}"/>
 <Cell N="Width" V="{lbl_w}"/>
 <Cell N="Height" V="{lbl_h}"/>
-<Cell N="LocPinX" V="{_r(lbl_w / 2)}"/>
-<Cell N="LocPinY" V="{_r(lbl_h / 2)}"/>
-<Cell N="Angle" V="0"/>
-<Cell N="FlipX" V="0"/>
-<Cell N="FlipY" V="0"/>
-<Cell N="ResizeMode" V="0"/>
+<Cell N="LocPinX" V="{half_w}"/>
+<Cell N="LocPinY" V="{half_h}"/>
+{_SHAPE_COMMON_HDR}
 <Cell N="TxtAngle" V="0"/>
-<Cell N="TxtPinX" V="{_r(lbl_w / 2)}"/>
-<Cell N="TxtPinY" V="{_r(lbl_h / 2)}"/>
+<Cell N="TxtPinX" V="{half_w}"/>
+<Cell N="TxtPinY" V="{half_h}"/>
 <Cell N="TxtWidth" V="{lbl_w}"/>
 <Cell N="TxtHeight" V="{lbl_h}"/>
-<Cell N="TxtLocPinX" V="{_r(lbl_w / 2)}"/>
-<Cell N="TxtLocPinY" V="{_r(lbl_h / 2)}"/>
-<Cell N="FillForegnd" V="#FFFFFF"/>
-<Cell N="FillForegndTrans" V="1"/>
-<Cell N="FillPattern" V="0"/>
-<Cell N="LinePattern" V="0"/>
+<Cell N="TxtLocPinX" V="{half_w}"/>
+<Cell N="TxtLocPinY" V="{half_h}"/>
+{_LABEL_FILL_LINE_CELLS}
 <Section N="Geometry" IX="0">
 <Cell N="NoFill" V="1"/>
 <Cell N="NoLine" V="1"/>
@@ -947,18 +1104,7 @@ def build_label_shape_xml(shape_id, pin_x, pin_y, lbl_w, lbl_h, text):
 <Row T="LineTo" IX="4"><Cell N="X" V="0"/><Cell N="Y" V="{lbl_h}"/></Row>
 <Row T="LineTo" IX="5"><Cell N="X" V="0"/><Cell N="Y" V="0"/></Row>
 </Section>
-<Section N="Character" IX="0">
-<Row IX="0">
-<Cell N="Font" V="0"/>
-<Cell N="Size" V="{label_size}"/>
-<Cell N="Color" V="#333333"/>
-</Row>
-</Section>
-<Section N="Paragraph" IX="0">
-<Row IX="0">
-<Cell N="HorzAlign" V="1"/>
-</Row>
-</Section>
+{_LABEL_CHAR_PARA}
 <Text>{escaped}</Text>
 </Shape>'''
 
@@ -981,106 +1127,95 @@ def _rounded_line_geometry(pts, bb_min_x, bb_min_y, radius=0.15):
     if len(pts) < 2:
         return ''
 
-    rows = ''
+    rows = []
     ix = 1  # Visio row index (1-based)
+    hypot, acos, cos = math.hypot, math.acos, math.cos  # per-vertex calls below
 
     def _local(px, py):
-        return _r(px - bb_min_x), _r(py - bb_min_y)
+        return _coord_text(px - bb_min_x), _coord_text(py - bb_min_y)
 
     if len(pts) == 2:
         # Straight line — no corners to round
         lx, ly = _local(*pts[0])
-        rows += f'<Row T="MoveTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n'
+        rows.append(f'<Row T="MoveTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n')
         ix += 1
         lx, ly = _local(*pts[1])
-        rows += f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n'
-        return rows
-
-    # For 3+ points, round each interior corner
-    for i in range(len(pts)):
-        if i == 0:
-            # Start point — just MoveTo
-            lx, ly = _local(*pts[0])
-            rows += f'<Row T="MoveTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n'
-            ix += 1
-        elif i == len(pts) - 1:
-            # End point — just LineTo
-            lx, ly = _local(*pts[i])
-            rows += f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n'
-            ix += 1
+        rows.append(f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n')
+        return ''.join(rows)
+
+    # For 3+ points, round each interior corner. Each segment's length and
+    # direction is computed once up front: every interior vertex needs both of
+    # its neighbouring segments, so per-vertex math would do each twice.
+    segs = []
+    for (x0, y0), (x1, y1) in zip(pts, pts[1:]):
+        dx, dy = x1 - x0, y1 - y0
+        length = hypot(dx, dy)
+        if length < 1e-6:
+            segs.append((length, 0.0, 0.0))
         else:
-            # Interior vertex — round this corner
-            p_prev = pts[i - 1]
-            p_curr = pts[i]
-            p_next = pts[i + 1]
-
-            # Vectors from current point to prev and next
-            dx1 = p_prev[0] - p_curr[0]
-            dy1 = p_prev[1] - p_curr[1]
-            dx2 = p_next[0] - p_curr[0]
-            dy2 = p_next[1] - p_curr[1]
-
-            len1 = math.sqrt(dx1 * dx1 + dy1 * dy1)
-            len2 = math.sqrt(dx2 * dx2 + dy2 * dy2)
-
-            if len1 < 1e-6 or len2 < 1e-6:
-                # Degenerate — just LineTo
-                lx, ly = _local(*p_curr)
-                rows += f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n'
-                ix += 1
-                continue
-
-            # Clamp radius so we don't exceed half the segment length
-            r = min(radius, len1 * 0.45, len2 * 0.45)
-
-            # Unit vectors
-            u1x, u1y = dx1 / len1, dy1 / len1
-            u2x, u2y = dx2 / len2, dy2 / len2
-
-            # Cut-back points (on the segments, `r` away from the corner)
-            cb1 = (p_curr[0] + u1x * r, p_curr[1] + u1y * r)
-            cb2 = (p_curr[0] + u2x * r, p_curr[1] + u2y * r)
-
-            # LineTo the cut-back point on the incoming segment
-            lx, ly = _local(*cb1)
-            rows += f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n'
+            segs.append((length, dx / length, dy / length))
+
+    # Start point — just MoveTo
+    lx, ly = _local(*pts[0])
+    rows.append(f'<Row T="MoveTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n')
+    ix += 1
+
+    for i in range(1, len(pts) - 1):
+        # Interior vertex — round this corner
+        cx, cy = pts[i]
+        len1, in_x, in_y = segs[i - 1]    # incoming direction (prev -> curr)
+        len2, out_x, out_y = segs[i]      # outgoing direction (curr -> next)
+
+        if len1 < 1e-6 or len2 < 1e-6:
+            # Degenerate — just LineTo
+            lx, ly = _local(cx, cy)
+            rows.append(f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n')
             ix += 1
+            continue
+
+        # Clamp radius so we don't exceed half the segment length
+        r = min(radius, len1 * 0.45, len2 * 0.45)
 
-            # Compute the arc sagitta (bow). For Visio ArcTo, the 'A' cell is
-            # the signed distance from the midpoint of the chord to the arc.
-            # Positive = left of chord direction, negative = right.
-            # The sagitta magnitude = r * (1 - cos(θ/2)) where θ is the
-            # exterior angle (turn angle) at the corner.
-            dot = u1x * u2x + u1y * u2y  # cos(π - θ) where θ is the turn angle
-            # θ = angle between the two outgoing directions
-            # The angle between the incoming direction (from prev) reversed and
-            # outgoing direction (to next):
-            #   incoming_dir = (-u1x, -u1y), outgoing_dir = (u2x, u2y)
-            #   cos(turn_angle) = dot(-incoming, outgoing) = -(u1·u2) = -dot
-            cos_half = math.sqrt((1 + (-dot)) / 2)  # cos(turn/2) — but we need sin
-            # Actually: sagitta = r * (1 - cos(half_turn))
-            # half_turn = turn_angle / 2
-            # cos(turn_angle) = -dot  =>  turn_angle = acos(-dot)
-            turn_angle = math.acos(max(-1, min(1, -dot)))
-            if turn_angle < 1e-4:
-                # Nearly straight — no arc needed
-                lx, ly = _local(*cb2)
-                rows += f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n'
-                ix += 1
-                continue
-
-            sagitta = r * (1 - math.cos(turn_angle / 2))
-
-            # Determine sign: cross product tells us which side
-            cross = (-u1x) * u2y - (-u1y) * u2x  # incoming_dir × outgoing_dir
-            if cross < 0:
-                sagitta = -sagitta
+        # Cut-back points (on the segments, `r` away from the corner)
+        cb1 = (cx - in_x * r, cy - in_y * r)
+        cb2 = (cx + out_x * r, cy + out_y * r)
 
+        # LineTo the cut-back point on the incoming segment
+        lx, ly = _local(*cb1)
+        rows.append(f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n')
+        ix += 1
+
+        # Compute the arc sagitta (bow). For Visio ArcTo, the 'A' cell is
+        # the signed distance from the midpoint of the chord to the arc.
+        # Positive = left of chord direction, negative = right.
+        # The sagitta magnitude = r * (1 - cos(θ/2)) where θ is the
+        # exterior angle (turn angle) at the corner:
+        #   cos(turn_angle) = incoming_dir · outgoing_dir
+        cos_turn = in_x * out_x + in_y * out_y
+        turn_angle = acos(max(-1, min(1, cos_turn)))
+        if turn_angle < 1e-4:
+            # Nearly straight — no arc needed
             lx, ly = _local(*cb2)
-            rows += f'<Row T="ArcTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/><Cell N="A" V="{_r(sagitta)}"/></Row>\n'
+            rows.append(f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n')
             ix += 1
+            continue
+
+        sagitta = r * (1 - cos(turn_angle / 2))
 
-    return rows
+        # Determine sign: cross product tells us which side
+        cross = in_x * out_y - in_y * out_x  # incoming_dir × outgoing_dir
+        if cross < 0:
+            sagitta = -sagitta
+
+        lx, ly = _local(*cb2)
+        rows.append(f'<Row T="ArcTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/><Cell N="A" V="{round(sagitta, 4)}"/></Row>\n')
+        ix += 1
+
+    # End point — just LineTo
+    lx, ly = _local(*pts[-1])
+    rows.append(f'<Row T="LineTo" IX="{ix}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n')
+
+    return ''.join(rows)
 
 
 def _build_line_shape(shape_id, name_prefix, waypoints, page_h, offset_x, offset_y,
@@ -1094,14 +1229,24 @@ def _build_line_shape(shape_id, name_prefix, waypoints, page_h, offset_x, offset
     if len(waypoints) < 2:
         return ''
 
-    # Convert all waypoints to Visio page coordinates
-    pts = [wp_to_visio(wp['x'], wp['y'], page_h, offset_x, offset_y) for wp in waypoints]
-
-    # Compute bounding box from waypoints
-    all_x = [p[0] for p in pts]
-    all_y = [p[1] for p in pts]
-    bb_min_x, bb_max_x = min(all_x), max(all_x)
-    bb_min_y, bb_max_y = min(all_y), max(all_y)
+    # Convert all waypoints to Visio page coordinates. This is wp_to_visio()
+    # inlined with the scale bound locally: it runs for every waypoint of every flow.
+    inv_ppi = INV_PPI
+    pts = [((wp['x'] - offset_x) * inv_ppi, page_h - (wp['y'] - offset_y) * inv_ppi)
+           for wp in waypoints]
+
+    # Compute bounding box from waypoints in one pass (no per-axis lists;
+    # for a handful of points this beats four min()/max() calls)
+    bb_min_x, bb_min_y = bb_max_x, bb_max_y = pts[0]
+    for px, py in pts:
+        if px < bb_min_x:
+            bb_min_x = px
+        elif px > bb_max_x:
+            bb_max_x = px
+        if py < bb_min_y:
+            bb_min_y = py
+        elif py > bb_max_y:
+            bb_max_y = py
 
     # Expand bounding box to include label area (if label falls outside waypoint bounds)
     # Without this, label local coordinates can exceed shape Width/Height and Visio clips them
@@ -1109,8 +1254,8 @@ def _build_line_shape(shape_id, name_prefix, waypoints, page_h, offset_x, offset
         lbl_cx = label_pos['x'] + label_pos['w'] / 2
         lbl_cy = label_pos['y'] + label_pos['h'] / 2
         lbl_vx, lbl_vy = wp_to_visio(lbl_cx, lbl_cy, page_h, offset_x, offset_y)
-        lbl_hw = label_pos['w'] / PPI / 2  # half-width in inches
-        lbl_hh = label_pos['h'] / PPI / 2  # half-height in inches
+        lbl_hw = label_pos['w'] * INV_PPI / 2  # half-width in inches
+        lbl_hh = label_pos['h'] * INV_PPI / 2  # half-height in inches
         bb_min_x = min(bb_min_x, lbl_vx - lbl_hw)
         bb_max_x = max(bb_max_x, lbl_vx + lbl_hw)
         bb_min_y = min(bb_min_y, lbl_vy - lbl_hh)
@@ -1119,8 +1264,8 @@ def _build_line_shape(shape_id, name_prefix, waypoints, page_h, offset_x, offset
     # Ensure non-zero dimensions (degenerate lines)
     w = max(bb_max_x - bb_min_x, 0.01)
     h = max(bb_max_y - bb_min_y, 0.01)
-    pin_x = _r((bb_min_x + bb_max_x) / 2)
-    pin_y = _r((bb_min_y + bb_max_y) / 2)
+    pin_x = round((bb_min_x + bb_max_x) / 2, 4)
+    pin_y = round((bb_min_y + bb_max_y) / 2, 4)
 
     # Geometry in local coords with rounded corners
     geom_rows = _rounded_line_geometry(pts, bb_min_x, bb_min_y,
@@ -1136,7 +1281,7 @@ def _build_line_shape(shape_id, name_prefix, waypoints, page_h, offset_x, offset
     char_xml = ''
     if label:
         text_xml = _text_xml(label)
-        label_size = _r(CONNECTOR_LABEL_SIZE / 72)
+        label_size = round(CONNECTOR_LABEL_SIZE / 72, 4)
         char_xml = (f'<Section N="Character" IX="0"><Row IX="0">'
                     f'<Cell N="Font" V="0"/><Cell N="Size" V="{label_size}"/>'
                     f'<Cell N="Color" V="{label_color}"/></Row></Section>')
@@ -1151,35 +1296,33 @@ def _build_line_shape(shape_id, name_prefix, waypoints, page_h, offset_x, offset
         # Convert to local coords relative to shape's bounding box origin (bottom-left)
         local_lbl_x = lbl_vx - bb_min_x
         local_lbl_y = lbl_vy - bb_min_y
-        txt_w = max(label_pos['w'] / PPI, 0.4)
-        txt_h = max(label_pos['h'] / PPI, 0.2)
-        txt_block = (f'<Cell N="TxtAngle" V="0"/>\n'
-                     f'<Cell N="TxtPinX" V="{_r(local_lbl_x)}"/>\n'
-                     f'<Cell N="TxtPinY" V="{_r(local_lbl_y)}"/>\n'
-                     f'<Cell N="TxtWidth" V="{_r(txt_w)}"/>\n'
-                     f'<Cell N="TxtHeight" V="{_r(txt_h)}"/>\n'
-                     f'<Cell N="TxtLocPinX" V="{_r(txt_w / 2)}"/>\n'
-                     f'<Cell N="TxtLocPinY" V="{_r(txt_h / 2)}"/>')
+        txt_pin_x = local_lbl_x
+        txt_pin_y = local_lbl_y
+        txt_w = max(label_pos['w'] * INV_PPI, 0.4)
+        txt_h = max(label_pos['h'] * INV_PPI, 0.2)
     else:
         # Fallback: center on connector bounding box
+        txt_pin_x = w / 2
+        txt_pin_y = h / 2
         txt_w = max(w, 0.6)
         txt_h = max(h, 0.3)
-        txt_block = (f'<Cell N="TxtAngle" V="0"/>\n'
-                     f'<Cell N="TxtPinX" V="{_r(w / 2)}"/>\n'
-                     f'<Cell N="TxtPinY" V="{_r(h / 2)}"/>\n'
-                     f'<Cell N="TxtWidth" V="{_r(txt_w)}"/>\n'
-                     f'<Cell N="TxtHeight" V="{_r(txt_h)}"/>\n'
-                     f'<Cell N="TxtLocPinX" V="{_r(txt_w / 2)}"/>\n'
-                     f'<Cell N="TxtLocPinY" V="{_r(txt_h / 2)}"/>')
 
+    # One template per connector: the text block cells are interpolated in
+    # place rather than pre-joined into a separate string first.
     return f'''<Shape ID="{shape_id}" NameU="{name_prefix}.{shape_id}" Type="Shape">
 <Cell N="PinX" V="{pin_x}"/>
 <Cell N="PinY" V="{pin_y}"/>
-<Cell N="Width" V="{_r(w)}"/>
-<Cell N="Height" V="{_r(h)}"/>
-<Cell N="LocPinX" V="{_r(w / 2)}"/>
-<Cell N="LocPinY" V="{_r(h / 2)}"/>
-{txt_block}
+<Cell N="Width" V="{round(w, 4)}"/>
+<Cell N="Height" V="{round(h, 4)}"/>
+<Cell N="LocPinX" V="{round(w / 2, 4)}"/>
+<Cell N="LocPinY" V="{round(h / 2, 4)}"/>
+<Cell N="TxtAngle" V="0"/>
+<Cell N="TxtPinX" V="{round(txt_pin_x, 4)}"/>
+<Cell N="TxtPinY" V="{round(txt_pin_y, 4)}"/>
+<Cell N="TxtWidth" V="{round(txt_w, 4)}"/>
+<Cell N="TxtHeight" V="{round(txt_h, 4)}"/>
+<Cell N="TxtLocPinX" V="{round(txt_w / 2, 4)}"/>
+<Cell N="TxtLocPinY" V="{round(txt_h / 2, 4)}"/>
 <Cell N="LineWeight" V="{line_weight}"/>
 <Cell N="LineColor" V="{line_color}"/>
 <Cell N="LinePattern" V="{line_pattern}"/>
@@ -1201,7 +1344,7 @@ def _arrow_geometry(from_pt, to_pt, bb_min_x, bb_min_y, arrow_len=0.08):
     Returns a second Geometry section (IX=1) with the arrowhead."""
     dx = to_pt[0] - from_pt[0]
     dy = to_pt[1] - from_pt[1]
-    length = math.sqrt(dx * dx + dy * dy)
+    length = math.hypot(dx, dy)
     if length < 1e-6:
         return ''
 
@@ -1222,12 +1365,14 @@ def _arrow_geometry(from_pt, to_pt, bb_min_x, bb_min_y, arrow_len=0.08):
 
     # Convert to local coords
     pts = [p1, p2, p3, p1]
-    rows = ''
+    parts = []
     for i, (ax, ay) in enumerate(pts):
-        lx = _r(ax - bb_min_x)
-        ly = _r(ay - bb_min_y)
+        lx = _coord_text(ax - bb_min_x)
+        ly = _coord_text(ay - bb_min_y)
         tag = 'MoveTo' if i == 0 else 'LineTo'
-        rows += f'<Row T="{tag}" IX="{i + 1}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n'
+        parts.append(f'<Row T="{tag}" IX="{i + 1}"><Cell N="X" V="{lx}"/><Cell N="Y" V="{ly}"/></Row>\n')
+
+    rows = ''.join(parts)
 
     return f'''<Section N="Geometry" IX="1">
 <Cell N="NoFill" V="0"/>
@@ -1254,17 +1399,157 @@ def build_message_flow_xml(shape_id, waypoints, page_h, offset_x, offset_y, labe
                              label_pos=label_pos)
 
 
-def build_association_xml(shape_id, waypoints, page_h, offset_x, offset_y):
-    """Build a dotted connector for associations (annotation links)."""
+def build_association_xml(shape_id, waypoints, page_h, offset_x, offset_y, label='', label_pos=None):
+    """Build a dotted connector for associations (annotation links).
+    Associations are drawn unlabelled; label/label_pos are accepted (and ignored)
+    so every flow builder shares one signature."""
     return _build_line_shape(shape_id, 'Assoc', waypoints, page_h, offset_x, offset_y,
                              line_color='#999999', line_weight='0.01',
                              line_pattern='3',  # 3=dash-dot
                              end_arrow='0', begin_arrow='0')
 
 
+# BPMN flow type -> connector builder (sequence flows use build_connector_xml)
+_FLOW_BUILDERS = {
+    'messageFlow': build_message_flow_xml,
+    'association': build_association_xml,
+}
+
+
+# Static package parts: identical in every .vsdx, so they are encoded once
+# at import and handed to the ZIP writer as bytes
+_CONTENT_TYPES_XML = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/visio/document.xml" ContentType="application/vnd.ms-visio.drawing.main+xml"/>
+<Override PartName="/visio/pages/pages.xml" ContentType="application/vnd.ms-visio.pages+xml"/>
+<Override PartName="/visio/pages/page1.xml" ContentType="application/vnd.ms-visio.page+xml"/>
+<Override PartName="/visio/windows.xml" ContentType="application/vnd.ms-visio.windows+xml"/>
+<Override PartName="/docProps/app.xml" ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>
+</Types>'''
+
+_RELS_XML = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.microsoft.com/visio/2010/relationships/document" Target="visio/document.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/extended-properties" Target="docProps/app.xml"/>
+</Relationships>'''
+
+_DOCUMENT_XML = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<VisioDocument xmlns="http://schemas.microsoft.com/office/visio/2012/main"
+ xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<DocumentProperties>
+<Creator>BPMN to VSDX Converter</Creator>
+</DocumentProperties>
+<DocumentSettings/>
+<Colors/>
+<FaceNames>
+<FaceName ID="0" Name="Calibri" UnicodeRanges="-1 -1 0 0" CharSets="536871423 0" Panos="2 15 5 2 2 2 4 3 2 4"/>
+</FaceNames>
+<StyleSheets>
+<StyleSheet ID="0" NameU="Normal" Name="Normal">
+<Cell N="LineWeight" V="0.01"/>
+<Cell N="LineColor" V="#333333"/>
+<Cell N="FillForegnd" V="#FFFFFF"/>
+<Cell N="CharFont" V="0"/>
+<Cell N="TxtHeight" V="0.1111"/>
+</StyleSheet>
+</StyleSheets>
+</VisioDocument>'''
+
+_DOCUMENT_RELS_XML = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.microsoft.com/visio/2010/relationships/pages" Target="pages/pages.xml"/>
+<Relationship Id="rId2" Type="http://schemas.microsoft.com/visio/2010/relationships/windows" Target="windows.xml"/>
+</Relationships>'''
+
+_PAGES_RELS_XML = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.microsoft.com/visio/2010/relationships/page" Target="page1.xml"/>
+</Relationships>'''
+
+# page1.xml is streamed from the shape XML between this head and tail
+_PAGE1_HEAD = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<PageContents xmlns="http://schemas.microsoft.com/office/visio/2012/main"
+ xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<Shapes>
+'''
+_PAGE1_TAIL = b'''
+</Shapes>
+</PageContents>'''
+
+_WINDOWS_XML = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Windows xmlns="http://schemas.microsoft.com/office/visio/2012/main">
+<Window ID="0" WindowType="Drawing" WindowState="1073741824" WindowLeft="0" WindowTop="0" WindowWidth="1024" WindowHeight="768">
+<StencilGroup/>
+<StencilGroupPos/>
+<ShowRulers>1</ShowRulers>
+<ShowGrid>1</ShowGrid>
+<ShowPageBreaks>0</ShowPageBreaks>
+<ShowGuides>1</ShowGuides>
+<ShowConnectionPoints>1</ShowConnectionPoints>
+<GlueSettings>9</GlueSettings>
+<SnapSettings>65847</SnapSettings>
+<SnapExtensions>34</SnapExtensions>
+<DynamicGridEnabled>1</DynamicGridEnabled>
+<TabSplitterPos>0.5</TabSplitterPos>
+</Window>
+</Windows>'''
+
+_APP_XML = b'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">
+<Application>BPMN to VSDX Converter</Application>
+</Properties>'''
+
+
+def _part_info(name):
+    """ZipInfo for a package part with a fixed timestamp and mode. Passing a
+    ZipInfo instead of a name keeps zipfile from stamping every member with
+    time.localtime(), so identical input yields an identical archive. A
+    ZipInfo does not inherit the archive's compression, so callers set it."""
+    zinfo = zipfile.ZipInfo(name, date_time=VSDX_DATE_TIME)
+    zinfo.external_attr = 0o644 << 16
+    return zinfo
+
+
+def _write_part(zf, name, data):
+    """Write one package part: tiny parts are stored as-is (deflating a few
+    hundred bytes saves nothing), everything else is deflated at the
+    archive's compresslevel."""
+    if len(data) < VSDX_STORE_BELOW:
+        zf.writestr(_part_info(name), data, compress_type=zipfile.ZIP_STORED)
+    else:
+        zf.writestr(_part_info(name), data, compress_type=zf.compression,
+                    compresslevel=zf.compresslevel)
+
+
+def _write_streamed_part(zf, name, head, parts, tail):
+    """Write head + '\n'.join(parts) + tail as one deflated package part
+    (head and tail are already-encoded bytes), feeding the compressor a slice
+    of parts at a time. The page never exists as a single str (nor as a
+    single encoded copy) in memory."""
+    zinfo = _part_info(name)
+    zinfo.compress_type = zf.compression
+    # ZipFile.open(zinfo, 'w') has no compresslevel argument and reads the
+    # level only from this private attribute (3.7+; still an alias in 3.13)
+    zinfo._compresslevel = zf.compresslevel
+    with zf.open(zinfo, 'w') as f:
+        f.write(head)
+        for start in range(0, len(parts), VSDX_PARTS_PER_WRITE):
+            if start:
+                f.write(b'\n')
+            f.write('\n'.join(parts[start:start + VSDX_PARTS_PER_WRITE]).encode('utf-8'))
+        f.write(tail)
+
+
 def build_vsdx(elements, flows, shapes, edges, output_path, process_name='',
-               participant_lanes=None):
-    """Build a complete .vsdx file from parsed BPMN data."""
+               participant_lanes=None, compresslevel=VSDX_COMPRESSLEVEL, ensure_dir=True):
+    """Build a complete .vsdx file from parsed BPMN data.
+
+    compresslevel: zlib level (0-9) for the deflated package parts.
+    ensure_dir: create the output directory if needed; batch callers that
+    already did so pass False to skip the per-file check.
+    """
     if participant_lanes is None:
         participant_lanes = {}
 
@@ -1317,6 +1602,8 @@ def build_vsdx(elements, flows, shapes, edges, output_path, process_name='',
                 and elem_id in shapes
                 and shapes[elem_id].get('is_horizontal', True)):
             header_widths[elem_id] = DEFAULT_HEADER_PX
+    # Convert to inches once, up front; the render loop only looks them up
+    header_widths_in = {bpmn_id: px * INV_PPI for bpmn_id, px in header_widths.items()}
 
     # Build lookup: which lane belongs to which participant
     lane_to_participant = {}
@@ -1333,35 +1620,40 @@ def build_vsdx(elements, flows, shapes, edges, output_path, process_name='',
     lane_parts = []   # lanes
     annot_parts = []  # text annotations
     fg_parts = []     # tasks, events, gateways
+    layer_parts = {'participant': pool_parts, 'lane': lane_parts, 'annotation': annot_parts}
     for bpmn_id, elem_info in elements.items():
-        if bpmn_id not in shapes:
-            continue
-        # Skip hidden lanes (single unnamed lane in a mono-lane pool)
-        if bpmn_id in hidden_lanes:
+        s = shapes.get(bpmn_id)
+        # Skip elements without DI, and hidden lanes (single unnamed lane in a mono-lane pool)
+        if s is None or bpmn_id in hidden_lanes:
             continue
-        s = shapes[bpmn_id]
-        category = get_element_category(elem_info['type'])
-        pin_x, pin_y, w, h = bpmn_to_visio_coords(s['x'], s['y'], s['w'], s['h'], page_h, offset_x, offset_y)
+        # Unpack the shape/element fields once; the rest of the body uses locals
+        sx, sy, sw, sh = s['x'], s['y'], s['w'], s['h']
+        label_x = s.get('label_x')
+        elem_type = elem_info['type']
+        elem_name = elem_info['name']
+        category = _ELEMENT_CATEGORY.get(elem_type, 'task')  # get_element_category(), inlined
+        pin_x, pin_y, w, h = bpmn_to_visio_coords(sx, sy, sw, sh, page_h, offset_x, offset_y)
 
         # Compute label offset from BPMN label bounds (for events/gateways)
         label_offset = None
-        if 'label_x' in s:
+        if label_x is not None:
+            label_y, label_w, label_h = s['label_y'], s['label_w'], s['label_h']
             # Shape center in BPMN pixels
-            shape_cx = s['x'] + s['w'] / 2
-            shape_cy = s['y'] + s['h'] / 2
+            shape_cx = sx + sw / 2
+            shape_cy = sy + sh / 2
             # Label center in BPMN pixels
-            label_cx = s['label_x'] + s['label_w'] / 2
-            label_cy = s['label_y'] + s['label_h'] / 2
+            label_cx = label_x + label_w / 2
+            label_cy = label_y + label_h / 2
             # Offset in inches (BPMN Y-down)
             label_offset = {
-                'dx': (label_cx - shape_cx) / PPI,
-                'dy': (label_cy - shape_cy) / PPI,
-                'lw': s['label_w'] / PPI,
-                'lh': s['label_h'] / PPI,
+                'dx': (label_cx - shape_cx) * INV_PPI,
+                'dy': (label_cy - shape_cy) * INV_PPI,
+                'lw': label_w * INV_PPI,
+                'lh': label_h * INV_PPI,
             }
 
         # Compute header width for pools/lanes (data-driven from BPMN coordinates)
-        header_width_in = header_widths.get(bpmn_id, 0) / PPI
+        header_width_in = header_widths_in.get(bpmn_id, 0.0)
         is_horizontal = s.get('is_horizontal', True)
 
         shape_id_map[bpmn_id] = next_id
@@ -1370,31 +1662,24 @@ def build_vsdx(elements, flows, shapes, edges, output_path, process_name='',
         # in-shape text blocks. Visio Desktop clips TxtPinX/TxtPinY to the shape's
         # geometry bounds, so text positioned outside circles/diamonds gets clipped.
         use_separate_label = (category in ('start_event', 'end_event',
-                              'intermediate_event', 'gateway') and elem_info['name'])
+                              'intermediate_event', 'gateway') and elem_name)
 
-        shape_name = '' if use_separate_label else elem_info['name']
+        shape_name = '' if use_separate_label else elem_name
         shape_xml = build_shape_xml(next_id, category, pin_x, pin_y, w, h, shape_name,
                                     fill_color=s.get('fill_color'), stroke_color=s.get('stroke_color'),
                                     label_offset=label_offset,
                                     header_width_in=header_width_in, is_horizontal=is_horizontal,
-                                    elem_type=elem_info['type'],
+                                    elem_type=elem_type,
                                     event_def=elem_info.get('event_def', ''))
-        if category == 'participant':
-            pool_parts.append(shape_xml)
-        elif category == 'lane':
-            lane_parts.append(shape_xml)
-        elif category == 'annotation':
-            annot_parts.append(shape_xml)
-        else:
-            fg_parts.append(shape_xml)
+        layer_parts.get(category, fg_parts).append(shape_xml)
         next_id += 1
 
         # Create separate label shape for events/gateways
         if use_separate_label:
-            if 'label_x' in s:
+            if label_x is not None:
                 # Use BPMN label bounds (absolute coordinates)
                 lbl_pin_x, lbl_pin_y, lbl_w, lbl_h = bpmn_to_visio_coords(
-                    s['label_x'], s['label_y'], s['label_w'], s['label_h'],
+                    label_x, label_y, label_w, label_h,
                     page_h, offset_x, offset_y)
             else:
                 # Fallback: position label below the shape
@@ -1403,31 +1688,29 @@ def build_vsdx(elements, flows, shapes, edges, output_path, process_name='',
                 lbl_pin_x = pin_x
                 lbl_pin_y = pin_y - h / 2 - lbl_h / 2 - 0.04
             label_xml = build_label_shape_xml(next_id, lbl_pin_x, lbl_pin_y,
-                                               lbl_w, lbl_h, elem_info['name'])
+                                               lbl_w, lbl_h, elem_name)
             if label_xml:
                 fg_parts.append(label_xml)
                 next_id += 1
 
-    shape_xml_parts = pool_parts + lane_parts + fg_parts + annot_parts
+    # Stack the layers into the pool list in place rather than concatenating copies
+    shape_xml_parts = pool_parts
+    shape_xml_parts += lane_parts
+    shape_xml_parts += fg_parts
+    shape_xml_parts += annot_parts
 
     # Build connector XML for each flow
     for flow in flows:
-        if flow['id'] in edges:
-            edge_data = edges[flow['id']]
-            waypoints = edge_data['waypoints']
-            label_pos = edge_data.get('label')  # BPMN label bounds or None
-            flow_type = flow.get('type', 'sequenceFlow')
-            if flow_type == 'messageFlow':
-                xml = build_message_flow_xml(next_id, waypoints, page_h, offset_x, offset_y, flow.get('name', ''), label_pos=label_pos)
-            elif flow_type == 'association':
-                xml = build_association_xml(next_id, waypoints, page_h, offset_x, offset_y)
-            else:
-                xml = build_connector_xml(next_id, waypoints, page_h, offset_x, offset_y, flow.get('name', ''), label_pos=label_pos)
-            if xml:
-                shape_xml_parts.append(xml)
-                next_id += 1
-
-    all_shapes_xml = '\n'.join(shape_xml_parts)
+        edge_data = edges.get(flow['id'])
+        if edge_data is None:
+            continue
+        label_pos = edge_data.get('label')  # BPMN label bounds or None
+        builder = _FLOW_BUILDERS.get(flow.get('type', 'sequenceFlow'), build_connector_xml)
+        xml = builder(next_id, edge_data['waypoints'], page_h, offset_x, offset_y,
+                      flow.get('name', ''), label_pos=label_pos)
+        if xml:
+            shape_xml_parts.append(xml)
+            next_id += 1
 
     # Page title
     page_name = process_name or 'BPMN Diagram'
@@ -1435,51 +1718,6 @@ def build_vsdx(elements, flows, shapes, edges, output_path, process_name='',
 
     # ── Build VSDX package files ──
 
-    content_types = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
-<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
-<Default Extension="xml" ContentType="application/xml"/>
-<Override PartName="/visio/document.xml" ContentType="application/vnd.ms-visio.drawing.main+xml"/>
-<Override PartName="/visio/pages/pages.xml" ContentType="application/vnd.ms-visio.pages+xml"/>
-<Override PartName="/visio/pages/page1.xml" ContentType="application/vnd.ms-visio.page+xml"/>
-<Override PartName="/visio/windows.xml" ContentType="application/vnd.ms-visio.windows+xml"/>
-<Override PartName="/docProps/app.xml" ContentType="application/vnd.openxmlformats-officedocument.extended-properties+xml"/>
-</Types>'''
-
-    rels = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
-<Relationship Id="rId1" Type="http://schemas.microsoft.com/visio/2010/relationships/document" Target="visio/document.xml"/>
-<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/extended-properties" Target="docProps/app.xml"/>
-</Relationships>'''
-
-    document_xml = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<VisioDocument xmlns="http://schemas.microsoft.com/office/visio/2012/main"
- xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
-<DocumentProperties>
-<Creator>BPMN to VSDX Converter</Creator>
-</DocumentProperties>
-<DocumentSettings/>
-<Colors/>
-<FaceNames>
-<FaceName ID="0" Name="Calibri" UnicodeRanges="-1 -1 0 0" CharSets="536871423 0" Panos="2 15 5 2 2 2 4 3 2 4"/>
-</FaceNames>
-<StyleSheets>
-<StyleSheet ID="0" NameU="Normal" Name="Normal">
-<Cell N="LineWeight" V="0.01"/>
-<Cell N="LineColor" V="#333333"/>
-<Cell N="FillForegnd" V="#FFFFFF"/>
-<Cell N="CharFont" V="0"/>
-<Cell N="TxtHeight" V="0.1111"/>
-</StyleSheet>
-</StyleSheets>
-</VisioDocument>'''
-
-    document_rels = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
-<Relationship Id="rId1" Type="http://schemas.microsoft.com/visio/2010/relationships/pages" Target="pages/pages.xml"/>
-<Relationship Id="rId2" Type="http://schemas.microsoft.com/visio/2010/relationships/windows" Target="windows.xml"/>
-</Relationships>'''
-
     pages_xml = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
 <Pages xmlns="http://schemas.microsoft.com/office/visio/2012/main"
  xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
@@ -1494,77 +1732,94 @@ def build_vsdx(elements, flows, shapes, edges, output_path, process_name='',
 </Page>
 </Pages>'''
 
-    pages_rels = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
-<Relationship Id="rId1" Type="http://schemas.microsoft.com/visio/2010/relationships/page" Target="page1.xml"/>
-</Relationships>'''
-
-    page1_xml = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<PageContents xmlns="http://schemas.microsoft.com/office/visio/2012/main"
- xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
-<Shapes>
-{all_shapes_xml}
-</Shapes>
-</PageContents>'''
-
-    windows_xml = f'''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Windows xmlns="http://schemas.microsoft.com/office/visio/2012/main">
-<Window ID="0" WindowType="Drawing" WindowState="1073741824" WindowLeft="0" WindowTop="0" WindowWidth="1024" WindowHeight="768">
-<StencilGroup/>
-<StencilGroupPos/>
-<ShowRulers>1</ShowRulers>
-<ShowGrid>1</ShowGrid>
-<ShowPageBreaks>0</ShowPageBreaks>
-<ShowGuides>1</ShowGuides>
-<ShowConnectionPoints>1</ShowConnectionPoints>
-<GlueSettings>9</GlueSettings>
-<SnapSettings>65847</SnapSettings>
-<SnapExtensions>34</SnapExtensions>
-<DynamicGridEnabled>1</DynamicGridEnabled>
-<TabSplitterPos>0.5</TabSplitterPos>
-</Window>
-</Windows>'''
-
-    app_xml = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<Properties xmlns="http://schemas.openxmlformats.org/officeDocument/2006/extended-properties">
-<Application>BPMN to VSDX Converter</Application>
-</Properties>'''
+    # Write ZIP package straight to a file (no in-memory archive copy). It goes
+    # to a temp file next to the target and is renamed over it only once
+    # complete, so a failed build never truncates or deletes an existing .vsdx.
+    if ensure_dir:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = f'{output_path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb', buffering=VSDX_WRITE_BUFFER) as f, \
+                zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED, compresslevel=compresslevel) as zf:
+            _write_part(zf, '[Content_Types].xml', _CONTENT_TYPES_XML)
+            _write_part(zf, '_rels/.rels', _RELS_XML)
+            _write_part(zf, 'visio/document.xml', _DOCUMENT_XML)
+            _write_part(zf, 'visio/_rels/document.xml.rels', _DOCUMENT_RELS_XML)
+            _write_part(zf, 'visio/pages/pages.xml', pages_xml)
+            _write_part(zf, 'visio/pages/_rels/pages.xml.rels', _PAGES_RELS_XML)
+            _write_streamed_part(zf, 'visio/pages/page1.xml', _PAGE1_HEAD, shape_xml_parts, _PAGE1_TAIL)
+            _write_part(zf, 'visio/windows.xml', _WINDOWS_XML)
+            _write_part(zf, 'docProps/app.xml', _APP_XML)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
-    # Write ZIP package
-    buf = BytesIO()
-    with zipfile.ZipFile(buf, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr('[Content_Types].xml', content_types)
-        zf.writestr('_rels/.rels', rels)
-        zf.writestr('visio/document.xml', document_xml)
-        zf.writestr('visio/_rels/document.xml.rels', document_rels)
-        zf.writestr('visio/pages/pages.xml', pages_xml)
-        zf.writestr('visio/pages/_rels/pages.xml.rels', pages_rels)
-        zf.writestr('visio/pages/page1.xml', page1_xml)
-        zf.writestr('visio/windows.xml', windows_xml)
-        zf.writestr('docProps/app.xml', app_xml)
 
-    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
-    with open(output_path, 'wb') as f:
-        f.write(buf.getvalue())
+# ── CLI ───────────────────────────────────────────────────────────────────────
 
+# Version suffix in exported filenames, e.g. "Order Handling - V1.2"
+_VER_RE = re.compile(r"\s*-\s*V\s*\d+\.\d+")
 
-# ── CLI ───────────────────────────────────────────────────────────────────────
 
 def get_process_name_from_filename(filename):
     """Extract process name from BPMN filename."""
     name = filename.replace("BPMN diagram - ", "")
-    name = re.sub(r"\s*-\s*V\s*\d+\.\d+", "", name)
+    name = _VER_RE.sub("", name)
     name = name.replace(".bpmn", "")
     return name.strip()
 
 
-def convert_bpmn_to_vsdx(bpmn_path, output_dir=None):
+@lru_cache(maxsize=None)
+def _converter_digest():
+    """Digest of this module's source, mixed into every cache key so .vsdx
+    files cached by a different converter version are never reused."""
+    # Cache-only imports stay local, off the import path of library users
+    # and batch workers that never pass a cache_dir
+    import hashlib
+    return hashlib.blake2b(Path(__file__).read_bytes(), digest_size=16).digest()
+
+
+def _cache_path(cache_dir, data, process_name, compresslevel):
+    """Cache entry for a BPMN file: keyed by its content and by everything
+    else that ends up in the .vsdx (page name, deflate level)."""
+    import hashlib
+    h = hashlib.blake2b(data, digest_size=16, key=_converter_digest())
+    h.update(f'\0{process_name}\0{compresslevel}'.encode('utf-8'))
+    return Path(cache_dir) / (h.hexdigest() + '.vsdx')
+
+
+def _store_in_cache(output_path, cached):
+    """Copy a freshly built .vsdx into the cache. The copy is renamed into
+    place so parallel workers never see a half-written entry."""
+    import shutil
+    try:
+        os.makedirs(cached.parent, exist_ok=True)
+        tmp = cached.with_name(f'{cached.name}.{os.getpid()}.tmp')
+        shutil.copyfile(output_path, tmp)
+        os.replace(tmp, cached)
+    except OSError as e:
+        print(f"  Warning: could not cache output: {e}")
+
+
+def convert_bpmn_to_vsdx(bpmn_path, output_dir=None, compresslevel=VSDX_COMPRESSLEVEL,
+                         cache_dir=None, verbose=False):
     """Public API: Convert a BPMN file to VSDX. Returns output path or None."""
-    return convert_file(bpmn_path, output_dir)
+    return convert_file(bpmn_path, output_dir, compresslevel=compresslevel, cache_dir=cache_dir,
+                        verbose=verbose)
+
 
+def convert_file(bpmn_path, output_dir=None, compresslevel=VSDX_COMPRESSLEVEL, cache_dir=None,
+                 verbose=False, ensure_dir=True):
+    """Convert a single BPMN file to VSDX.
 
-def convert_file(bpmn_path, output_dir=None):
-    """Convert a single BPMN file to VSDX."""
+    cache_dir: optional directory of previously built .vsdx files keyed by
+    input content; an unchanged input is copied from there instead of being
+    parsed and rebuilt.
+    verbose: print the full traceback when a conversion fails.
+    ensure_dir: create the output directory if needed (see build_vsdx).
+    """
     bpmn_path = Path(bpmn_path)
     if not bpmn_path.exists():
         print(f"Error: File not found: {bpmn_path}")
@@ -1581,6 +1836,22 @@ def convert_file(bpmn_path, output_dir=None):
 
     print(f"Converting: {bpmn_path.name}")
     try:
+        cached = None
+        if cache_dir:
+            try:
+                cached = _cache_path(cache_dir, bpmn_path.read_bytes(), process_name, compresslevel)
+                if cached.is_file():
+                    import shutil
+                    if ensure_dir:
+                        os.makedirs(out_dir, exist_ok=True)
+                    shutil.copyfile(cached, output_path)
+                    print(f"  Output: {output_path} (cached)")
+                    return True
+            except OSError as e:
+                # The cache only saves work; without it, convert as usual
+                print(f"  Warning: cache unavailable: {e}")
+                cached = None
+
         elements, flows, shapes, edges, participant_lanes = parse_bpmn(str(bpmn_path))
         print(f"  Found {len(elements)} elements, {len(flows)} flows, {len(shapes)} shapes")
 
@@ -1589,26 +1860,91 @@ def convert_file(bpmn_path, output_dir=None):
             return False
 
         build_vsdx(elements, flows, shapes, edges, str(output_path), process_name,
-                   participant_lanes=participant_lanes)
+                   participant_lanes=participant_lanes, compresslevel=compresslevel,
+                   ensure_dir=ensure_dir)
+        if cached is not None:
+            _store_in_cache(output_path, cached)
         print(f"  Output: {output_path}")
         return True
     except Exception as e:
-        print(f"  Error: {e}")
-        import traceback
-        traceback.print_exc()
+        # One line per failure; formatting a traceback reads source files
+        # from disk, which dominates a batch full of malformed diagrams
+        print(f"  Error: {type(e).__name__}: {e}")
+        if verbose:
+            import traceback
+            traceback.print_exc()
         return False
 
 
+def _convert_file_captured(bpmn_path, output_dir=None, cache_dir=None, verbose=False):
+    """Run convert_file() in a batch worker and return (success, printed output).
+    Capturing lets the parent print each file's progress as one block, in input
+    order, instead of interleaving lines from several processes."""
+    buf = StringIO()
+    with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
+        # The batch output directory exists already: -o is created up front
+        # by main(), and otherwise each file goes next to its source
+        ok = convert_file(bpmn_path, output_dir, cache_dir=cache_dir, verbose=verbose,
+                          ensure_dir=False)
+    return ok, buf.getvalue()
+
+
+def _iter_bpmn_files(root):
+    """Yield every .bpmn file under root, walking lazily so conversion can start
+    before a deep tree has been fully listed. Files and subdirectories are
+    visited together in name order, which yields the same sequence as
+    sorted(root.glob('**/*.bpmn'))."""
+    try:
+        with os.scandir(root) as it:
+            entries = sorted(it, key=lambda entry: os.path.normcase(entry.name))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir() and not entry.is_symlink():
+            # Like pathlib's '**', do not recurse through directory symlinks
+            yield from _iter_bpmn_files(entry.path)
+        elif os.path.normcase(entry.name).endswith('.bpmn'):
+            yield Path(entry.path)
+
+
+def _map_ahead(executor, fn, items, args, ahead):
+    """Yield fn(item, *args) for each item, in input order, computed on executor.
+    Unlike Executor.map, which submits everything before returning, at most
+    `ahead` tasks are in flight, so a lazy `items` keeps being read while the
+    workers convert the files already submitted."""
+    from collections import deque
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item, *args))
+        if len(pending) >= ahead:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
 def main():
+    # CLI-only imports: keep them off the import path of library users and
+    # of batch worker processes, which only need convert_file().
+    import argparse
+    from concurrent.futures import ProcessPoolExecutor
+
     parser = argparse.ArgumentParser(description='Convert BPMN 2.0 XML files to Visio .vsdx format')
     parser.add_argument('input', nargs='?', help='Input BPMN file path')
     parser.add_argument('--batch', metavar='FOLDER', help='Convert all .bpmn files in folder')
     parser.add_argument('-o', '--output', metavar='DIR', help='Output directory (default: same as input)')
+    parser.add_argument('-j', '--jobs', metavar='N', type=int,
+                        help='Parallel worker processes for --batch (default: all CPU cores; 1 = no pool)')
+    parser.add_argument('--cache', metavar='DIR',
+                        help='Reuse .vsdx output for unchanged inputs, keyed by file content')
+    parser.add_argument('-v', '--verbose', action='store_true',
+                        help='Print the full traceback when a conversion fails')
     args = parser.parse_args()
 
     if not args.input and not args.batch:
         parser.print_help()
         sys.exit(1)
+    if args.jobs is not None and args.jobs < 1:
+        parser.error('--jobs must be at least 1')
 
     success_count = 0
     fail_count = 0
@@ -1619,20 +1955,41 @@ def main():
             print(f"Error: Directory not found: {batch_dir}")
             sys.exit(1)
 
-        bpmn_files = sorted(batch_dir.glob('**/*.bpmn'))
-        if not bpmn_files:
+        bpmn_files = _iter_bpmn_files(batch_dir)
+        first = next(bpmn_files, None)
+        if first is None:
             print(f"No .bpmn files found in {batch_dir}")
             sys.exit(1)
-
-        print(f"Found {len(bpmn_files)} BPMN files\n")
-        for bpmn_file in bpmn_files:
-            if convert_file(bpmn_file, args.output):
-                success_count += 1
+        bpmn_files = chain([first], bpmn_files)
+        if args.verbose:
+            # Counting means listing the whole tree before the first conversion
+            bpmn_files = list(bpmn_files)
+            print(f"Found {len(bpmn_files)} BPMN files\n")
+        if args.output:
+            # Create the shared output directory once, not in every worker
+            os.makedirs(args.output, exist_ok=True)
+        # Each file is an independent, CPU-bound conversion: fan out across cores
+        with contextlib.ExitStack() as stack:
+            if args.jobs == 1:
+                # Single worker: convert in-process, skipping the pool start-up
+                results = map(_convert_file_captured, bpmn_files, repeat(args.output),
+                              repeat(args.cache), repeat(args.verbose))
             else:
-                fail_count += 1
-            print()
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=args.jobs))
+                # A few queued files per worker keeps every core busy while
+                # the directory walk continues
+                workers = args.jobs or os.cpu_count() or 1
+                results = _map_ahead(executor, _convert_file_captured, bpmn_files,
+                                     (args.output, args.cache, args.verbose), ahead=4 * workers)
+            for ok, output in results:
+                print(output, end='')
+                if ok:
+                    success_count += 1
+                else:
+                    fail_count += 1
+                print()
     elif args.input:
-        if convert_file(args.input, args.output):
+        if convert_file(args.input, args.output, cache_dir=args.cache, verbose=args.verbose):
             success_count += 1
         else:
             fail_count += 1